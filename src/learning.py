@@ -1,13 +1,28 @@
 from __future__ import annotations
 
+import os
 from datetime import date, timedelta
 
-from src.scrapers.google_flights_ui import search_google_flights
-from src.store import save_learning_snapshot
+from src.run_progress import RunProgress
+from src.scrapers.google_flights_ui import (
+    AIRPORTS,
+    BrowserSession,
+    search_calendar_prices,
+    search_google_flights,
+    unfinished_pairs,
+)
+from src.store import StoreSession
 
 
 OFFSETS = [30, 45, 60, 75, 90, 120, 150]
 
+# "detail": scrape every sample's legs.
+# "calendar": sweep the date grid once per route, then only detail-scrape the
+# samples whose calendar combo is within INTERESTING_MARGIN of the cheapest
+# sample at the same offset.
+LEARNING_MODE = os.environ.get("LEARNING_MODE", "detail")
+INTERESTING_MARGIN = 0.15
+
 
 def _next_weekday(base: date, weekday: int) -> date:
     days_ahead = (weekday - base.weekday()) % 7
@@ -36,60 +51,166 @@ def _best_row(rows: list[dict]) -> dict | None:
     return sorted(rows, key=lambda r: r["price"])[0]
 
 
-def run_learning_sampling(run_date: date):
-    print("[INFO] Starting learning sampling...")
+def _build_samples(run_date: date) -> list[tuple[int, str, date, date]]:
+    samples: list[tuple[int, str, date, date]] = []
 
     for offset in OFFSETS:
-        patterns = _build_pairs_for_offset(run_date, offset)
-
-        for pattern_name, outbound, inbound in patterns:
-            try:
-                rows = search_google_flights(
-                    [(outbound, inbound)],
-                    allow_klm_from_ams=True,
-                )
-
-                outbound_rows = [r for r in rows if r["leg_type"] == "outbound"]
-                inbound_rows = [r for r in rows if r["leg_type"] == "inbound"]
-
-                best_out_row = _best_row(outbound_rows)
-                best_in_row = _best_row(inbound_rows)
-
-                best_out = best_out_row["price"] if best_out_row else None
-                best_in = best_in_row["price"] if best_in_row else None
-
-                best_combo = None
-                if best_out is not None and best_in is not None:
-                    best_combo = best_out + best_in
-
-                save_learning_snapshot(
-                    run_date=run_date,
-                    sample_name=f"{offset}_{pattern_name}",
-                    outbound=outbound,
-                    inbound=inbound,
-                    days_to_departure=(outbound - run_date).days,
-                    pattern=pattern_name,
-                    best_outbound=best_out,
-                    best_inbound=best_in,
-                    best_combo=best_combo,
-                    outbound_origin=best_out_row.get("origin") if best_out_row else None,
-                    outbound_destination=best_out_row.get("destination") if best_out_row else None,
-                    outbound_airline=best_out_row.get("airline") if best_out_row else None,
-                    outbound_departure_time=best_out_row.get("outbound_departure") if best_out_row else None,
-                    outbound_arrival_time=best_out_row.get("outbound_arrival") if best_out_row else None,
-                    outbound_source_url=best_out_row.get("source_url") if best_out_row else None,
-                    inbound_origin=best_in_row.get("origin") if best_in_row else None,
-                    inbound_destination=best_in_row.get("destination") if best_in_row else None,
-                    inbound_airline=best_in_row.get("airline") if best_in_row else None,
-                    inbound_departure_time=best_in_row.get("outbound_departure") if best_in_row else None,
-                    inbound_arrival_time=best_in_row.get("outbound_arrival") if best_in_row else None,
-                    inbound_source_url=best_in_row.get("source_url") if best_in_row else None,
-                )
-
-                print(
-                    f"[INFO] Learning saved {offset}d {pattern_name} "
-                    f"combo={best_combo}"
-                )
-
-            except Exception as e:
-                print(f"[ERROR] Learning {offset} {pattern_name}: {e}")
+        for pattern_name, outbound, inbound in _build_pairs_for_offset(run_date, offset):
+            samples.append((offset, pattern_name, outbound, inbound))
+
+    return samples
+
+
+def _calendar_combo(
+    calendars: dict[tuple[str, str], dict[date, float]],
+    outbound: date,
+    inbound: date,
+) -> float | None:
+    out_prices = [calendars.get((a, "BCN"), {}).get(outbound) for a in AIRPORTS]
+    in_prices = [calendars.get(("BCN", a), {}).get(inbound) for a in AIRPORTS]
+
+    best_out = min((p for p in out_prices if p is not None), default=None)
+    best_in = min((p for p in in_prices if p is not None), default=None)
+
+    if best_out is None or best_in is None:
+        return None
+    return best_out + best_in
+
+
+def _select_interesting_samples(
+    run_date: date,
+    samples: list[tuple[int, str, date, date]],
+    session: BrowserSession | None,
+    store: StoreSession,
+) -> list[tuple[int, str, date, date]]:
+    routes = [(a, "BCN") for a in AIRPORTS] + [("BCN", a) for a in AIRPORTS]
+    start = min(outbound for _, _, outbound, _ in samples)
+    end = max(inbound for _, _, _, inbound in samples)
+
+    calendars = search_calendar_prices(routes, start, end, session=session)
+
+    for (origin, destination), prices in calendars.items():
+        if prices:
+            store.add_calendar_prices(run_date, origin, destination, prices)
+
+    combos = {
+        (outbound, inbound): _calendar_combo(calendars, outbound, inbound)
+        for _, _, outbound, inbound in samples
+    }
+
+    best_by_offset: dict[int, float] = {}
+    for offset, _, outbound, inbound in samples:
+        combo = combos[(outbound, inbound)]
+        if combo is not None and (offset not in best_by_offset or combo < best_by_offset[offset]):
+            best_by_offset[offset] = combo
+
+    selected = []
+    for sample in samples:
+        offset, _, outbound, inbound = sample
+        combo = combos[(outbound, inbound)]
+        # No calendar price (sweep failed or date not shown): scrape it.
+        if combo is None or combo <= best_by_offset[offset] * (1 + INTERESTING_MARGIN):
+            selected.append(sample)
+
+    print(f"[INFO] Calendar sweep kept {len(selected)}/{len(samples)} learning samples")
+    return selected
+
+
+def run_learning_sampling(
+    run_date: date,
+    session: BrowserSession | None = None,
+    concurrency: int = 1,
+    progress: RunProgress | None = None,
+    store: StoreSession | None = None,
+):
+    if store is None:
+        with StoreSession() as own_store:
+            return run_learning_sampling(run_date, session, concurrency, progress, own_store)
+
+    print("[INFO] Starting learning sampling...")
+
+    samples = _build_samples(run_date)
+
+    if LEARNING_MODE == "calendar" and not (progress is not None and progress.expired()):
+        try:
+            samples = _select_interesting_samples(run_date, samples, session, store)
+            store.flush()
+        except Exception as e:
+            print(f"[ERROR] Learning calendar sweep: {e}")
+
+    pairs = list(dict.fromkeys((outbound, inbound) for _, _, outbound, inbound in samples))
+
+    # One search for every sample: a single browser session, and legs shared
+    # between patterns (THU-SUN / THU-MON) are only loaded once.
+    try:
+        all_rows = search_google_flights(
+            pairs,
+            allow_klm_from_ams=True,
+            concurrency=concurrency,
+            session=session,
+            progress=progress,
+        )
+    except Exception as e:
+        print(f"[ERROR] Learning search: {e}")
+        return
+
+    store.add_leg_observations(run_date, all_rows)
+
+    # Samples cut short by the time budget get no snapshot rather than an empty one.
+    unfinished = set(unfinished_pairs(pairs, progress, allow_klm_from_ams=True)) if progress else set()
+
+    for offset, pattern_name, outbound, inbound in samples:
+        if (outbound, inbound) in unfinished:
+            print(f"[INFO] Learning {offset}d {pattern_name} skipped (time budget)")
+            continue
+
+        try:
+            rows = [
+                r for r in all_rows
+                if r["outbound"] == outbound and r["inbound"] == inbound
+            ]
+
+            outbound_rows = [r for r in rows if r["leg_type"] == "outbound"]
+            inbound_rows = [r for r in rows if r["leg_type"] == "inbound"]
+
+            best_out_row = _best_row(outbound_rows)
+            best_in_row = _best_row(inbound_rows)
+
+            best_out = best_out_row["price"] if best_out_row else None
+            best_in = best_in_row["price"] if best_in_row else None
+
+            best_combo = None
+            if best_out is not None and best_in is not None:
+                best_combo = best_out + best_in
+
+            store.add_learning_snapshot(
+                run_date=run_date,
+                sample_name=f"{offset}_{pattern_name}",
+                outbound=outbound,
+                inbound=inbound,
+                days_to_departure=(outbound - run_date).days,
+                pattern=pattern_name,
+                best_outbound=best_out,
+                best_inbound=best_in,
+                best_combo=best_combo,
+                outbound_origin=best_out_row.get("origin") if best_out_row else None,
+                outbound_destination=best_out_row.get("destination") if best_out_row else None,
+                outbound_airline=best_out_row.get("airline") if best_out_row else None,
+                outbound_departure_time=best_out_row.get("outbound_departure") if best_out_row else None,
+                outbound_arrival_time=best_out_row.get("outbound_arrival") if best_out_row else None,
+                outbound_source_url=best_out_row.get("source_url") if best_out_row else None,
+                inbound_origin=best_in_row.get("origin") if best_in_row else None,
+                inbound_destination=best_in_row.get("destination") if best_in_row else None,
+                inbound_airline=best_in_row.get("airline") if best_in_row else None,
+                inbound_departure_time=best_in_row.get("outbound_departure") if best_in_row else None,
+                inbound_arrival_time=best_in_row.get("outbound_arrival") if best_in_row else None,
+                inbound_source_url=best_in_row.get("source_url") if best_in_row else None,
+            )
+
+            print(
+                f"[INFO] Learning saved {offset}d {pattern_name} "
+                f"combo={best_combo}"
+            )
+
+        except Exception as e:
+            print(f"[ERROR] Learning {offset} {pattern_name}: {e}")
@@ -1,19 +1,81 @@
 from __future__ import annotations
 
+import argparse
+import os
 from datetime import date
 
 from src.planner import generate_weekend_pairs
-from src.scrapers.google_flights_ui import search_google_flights
+from src.scrapers.google_flights_ui import (
+    BrowserSession,
+    search_google_flights,
+    search_google_flights_sharded,
+    unfinished_pairs,
+)
 from src.report import build_html_report
+from src.run_progress import RunProgress
+from src.scan_scheduler import plan_incremental_scan, prioritize_pairs
+from src.scrapers.providers import PROVIDERS, GoogleFlightsProvider, search_weekends
 from src.emailer import send_email_html
-from src.store import init_db, save_weekend_snapshot
+from src.store import StoreSession, init_db
 from src.learning import run_learning_sampling
 
 
-def main() -> None:
+SCRAPER_CONCURRENCY = int(os.environ.get("SCRAPER_CONCURRENCY", "1"))
+SCRAPER_SHARDS = int(os.environ.get("SCRAPER_SHARDS", "1"))
+# Wall-clock limit for the shard processes, so a hung browser cannot stall
+# the run; 0 disables it. --time-budget tightens it further.
+SHARD_TIMEOUT_S = float(os.environ.get("SHARD_TIMEOUT_S", "3600"))
+INCREMENTAL_SCAN = os.environ.get("INCREMENTAL_SCAN", "1") != "0"
+
+# Comma-separated, e.g. "google_flights,skyscanner" to cross-check sources.
+FLIGHT_PROVIDERS = [
+    name.strip()
+    for name in os.environ.get("FLIGHT_PROVIDERS", "google_flights").split(",")
+    if name.strip()
+]
+
+
+def _build_providers(session: BrowserSession) -> list:
+    providers = []
+    for name in FLIGHT_PROVIDERS:
+        if name == "google_flights":
+            providers.append(GoogleFlightsProvider(concurrency=SCRAPER_CONCURRENCY, session=session))
+        elif name in PROVIDERS:
+            providers.append(PROVIDERS[name]())
+        else:
+            print(f"[ERROR] Unknown provider {name}, ignoring")
+    return providers
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scrape weekend flights and email the report.")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="reuse legs already completed today instead of scraping them again",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        metavar="MINUTES",
+        help=(
+            "wall-clock budget for the whole run; the most valuable legs are "
+            "scraped first and the rest are skipped and recorded"
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = _parse_args(argv)
     run_date = date.today()
 
     init_db()
+    progress = RunProgress(
+        run_date,
+        resume=args.resume,
+        time_budget_s=args.time_budget * 60 if args.time_budget else None,
+    )
 
     print("[INFO] Generating weekend pairs...")
     pairs = generate_weekend_pairs(
@@ -22,39 +84,84 @@ def main() -> None:
         skip_weeks=1,
     )
 
-    print("[INFO] Scraping operational flights...")
-    rows = search_google_flights(pairs)
-
-    for outbound, inbound in pairs:
-        weekend_rows = [
-            r for r in rows
-            if r["outbound"] == outbound and r["inbound"] == inbound
-        ]
-
-        outbound_rows = [r for r in weekend_rows if r["leg_type"] == "outbound"]
-        inbound_rows = [r for r in weekend_rows if r["leg_type"] == "inbound"]
-
-        best_out = min([r["price"] for r in outbound_rows], default=None)
-        best_in = min([r["price"] for r in inbound_rows], default=None)
-
-        best_combo = None
-        if best_out is not None and best_in is not None:
-            best_combo = best_out + best_in
-
-        save_weekend_snapshot(
-            run_date=run_date,
-            outbound=outbound,
-            inbound=inbound,
-            best_outbound=best_out,
-            best_inbound=best_in,
-            best_combo=best_combo,
+    stale_pairs: list = []
+    if INCREMENTAL_SCAN:
+        pairs, stale_pairs = plan_incremental_scan(run_date, pairs)
+
+    if progress.deadline is not None:
+        # Legs are scraped in pair order, so the budget goes to these first.
+        pairs = prioritize_pairs(run_date, pairs)
+
+    # One browser and one DB connection for the main scan and the learning engine.
+    with BrowserSession() as session, StoreSession() as store:
+        print("[INFO] Scraping operational flights...")
+        if FLIGHT_PROVIDERS != ["google_flights"]:
+            rows = search_weekends(pairs, _build_providers(session), progress=progress)
+        elif SCRAPER_SHARDS > 1:
+            rows = search_google_flights_sharded(
+                pairs,
+                shards=SCRAPER_SHARDS,
+                shard_timeout_s=SHARD_TIMEOUT_S or None,
+                progress=progress,
+            )
+        else:
+            rows = search_google_flights(
+                pairs,
+                concurrency=SCRAPER_CONCURRENCY,
+                session=session,
+                progress=progress,
+            )
+
+        # Weekends the budget cut short get no snapshot; the report carries
+        # their last known price forward like any other stale weekend.
+        unfinished = unfinished_pairs(pairs, progress)
+        if unfinished:
+            print(f"[INFO] {len(unfinished)} weekends not fully scraped within the time budget")
+            pairs = [pair for pair in pairs if pair not in unfinished]
+            rows = [r for r in rows if (r["outbound"], r["inbound"]) not in unfinished]
+
+        for outbound, inbound in pairs:
+            weekend_rows = [
+                r for r in rows
+                if r["outbound"] == outbound and r["inbound"] == inbound
+            ]
+
+            outbound_rows = [r for r in weekend_rows if r["leg_type"] == "outbound"]
+            inbound_rows = [r for r in weekend_rows if r["leg_type"] == "inbound"]
+
+            best_out = min([r["price"] for r in outbound_rows], default=None)
+            best_in = min([r["price"] for r in inbound_rows], default=None)
+
+            best_combo = None
+            if best_out is not None and best_in is not None:
+                best_combo = best_out + best_in
+
+            store.add_weekend_snapshot(
+                run_date=run_date,
+                outbound=outbound,
+                inbound=inbound,
+                best_outbound=best_out,
+                best_inbound=best_in,
+                best_combo=best_combo,
+            )
+
+        store.add_leg_observations(run_date, rows)
+
+        # Commit the main scan before the learning stage starts scraping.
+        store.flush()
+
+        print("[INFO] Running learning engine before report...")
+        run_learning_sampling(
+            run_date,
+            session=session,
+            concurrency=SCRAPER_CONCURRENCY,
+            progress=progress,
+            store=store,
         )
-
-    print("[INFO] Running learning engine before report...")
-    run_learning_sampling(run_date)
+        store.flush()
 
     print("[INFO] Building report...")
-    html = build_html_report(run_date, rows)
+    html = build_html_report(run_date, rows, stale_pairs=stale_pairs, skipped_pairs=unfinished)
 
     print("[INFO] Sending email...")
     send_email_html(
@@ -36,6 +36,18 @@ class DatePair:
         return self.outbound_date
 
 
+@dataclass(frozen=True)
+class LegRequest:
+    origin: str
+    destination: str
+    leg_date: date
+    allow_klm_from_ams: bool = False
+
+    @property
+    def leg_type(self) -> str:
+        return "outbound" if self.destination == "BCN" else "inbound"
+
+
 @dataclass(frozen=True)
 class FlightOption:
     origin: str
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import random
+import sqlite3
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+
+from src import store
+
+
+# Statements worth planning; plain INSERT ... VALUES never scans.
+PLANNED_PREFIXES = ("SELECT", "DELETE", "UPDATE", "WITH")
+
+
+def build_synthetic_db(db_path: Path, years: int = 3, seed: int = 7) -> None:
+    """
+    A DB shaped like `years` of daily runs: 28 weekends, 28 learning samples
+    and 84 leg observations per day.
+    """
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=365 * years)
+
+    store.DB_PATH = db_path
+    store.init_db()
+
+    with store.StoreSession() as session:
+        for day in range(365 * years):
+            run_date = start + timedelta(days=day)
+
+            for week in range(1, 8):
+                thu = run_date + timedelta(days=7 * week + (3 - run_date.weekday()) % 7)
+                for outbound, inbound in (
+                    (thu, thu + timedelta(days=3)),
+                    (thu, thu + timedelta(days=4)),
+                    (thu + timedelta(days=1), thu + timedelta(days=3)),
+                    (thu + timedelta(days=1), thu + timedelta(days=4)),
+                ):
+                    out_price = rng.randint(40, 200)
+                    in_price = rng.randint(40, 200)
+                    session.add_weekend_snapshot(run_date, outbound, inbound, out_price, in_price, out_price + in_price)
+
+                for origin, destination, leg_date in (("AMS", "BCN", thu), ("BCN", "AMS", thu + timedelta(days=3))):
+                    session.add_leg_observations(
+                        run_date,
+                        [
+                            {
+                                "origin": origin,
+                                "destination": destination,
+                                "leg_date": leg_date,
+                                "airline": airline,
+                                "outbound_departure": f"{hour}:{rng.choice(('05', '35'))} PM",
+                                "outbound_arrival": f"{hour + 2}:{rng.choice(('15', '45'))} PM",
+                                "price": rng.randint(4000, 20000) / 100,
+                                "provider": "google_flights",
+                            }
+                            for airline, hour in (("Vueling", 4), ("Transavia", 6), ("KLM", 8))
+                        ],
+                    )
+
+            for offset in (30, 45, 60, 75, 90, 120, 150):
+                for pattern in ("THU-SUN", "THU-MON", "FRI-SUN", "FRI-MON"):
+                    outbound = run_date + timedelta(days=offset)
+                    session.add_learning_snapshot(
+                        run_date,
+                        f"{offset}_{pattern}",
+                        outbound,
+                        outbound + timedelta(days=3),
+                        days_to_departure=offset,
+                        pattern=pattern,
+                        best_combo=rng.randint(80, 400),
+                    )
+
+            if day % 90 == 0:
+                session.flush()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+@contextmanager
+def _traced_store(statements: list[str]):
+    """Record every statement the store functions run, with parameters bound."""
+    original = store.get_conn
+
+    def _get_conn():
+        conn = original()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    store.get_conn = _get_conn
+    try:
+        yield
+    finally:
+        store.get_conn = original
+
+
+def _exercise_store() -> None:
+    today = date.today()
+    outbound = today + timedelta(days=(3 - today.weekday()) % 7)
+
+    store.get_weekend_history(outbound, outbound + timedelta(days=3))
+    store.get_weekend_summaries(
+        [(outbound + timedelta(days=7 * week), outbound + timedelta(days=7 * week + 3)) for week in range(8)],
+        before=today,
+        priced_only=True,
+    )
+    store.get_latest_learning_opportunities(limit=10)
+    store.get_learning_stats(days_to_departure=60, pattern="THU-SUN")
+    store.get_leg_progress(today)
+    store.clear_leg_progress(today, keep_current=False)
+    store.save_leg_progress(today, "AMS", "BCN", outbound, False, [])
+    store.save_weekend_snapshot(today, outbound, outbound + timedelta(days=3), 50, 60, 110)
+    store.save_learning_snapshot(today, "30_THU-SUN", outbound, outbound + timedelta(days=3), pattern="THU-SUN")
+    store.get_leg_observations("AMS", "BCN", outbound)
+    # A rerun: today's snapshot exists, so the minima before today are recomputed.
+    store.get_weekend_summaries([(outbound, outbound + timedelta(days=3))], before=today, priced_only=True)
+
+    with store.StoreSession() as session:
+        session.add_leg_observations(
+            today,
+            [
+                {
+                    "origin": "AMS",
+                    "destination": "BCN",
+                    "leg_date": outbound,
+                    "airline": "Vueling",
+                    "outbound_departure": "4:05 PM",
+                    "outbound_arrival": "6:15 PM",
+                    "price": 49.99,
+                }
+            ],
+        )
+
+
+def full_scans(db_path: Path) -> list[tuple[str, str]]:
+    """(statement, plan line) for every store query that scans a whole table."""
+    statements: list[str] = []
+    with _traced_store(statements):
+        _exercise_store()
+
+    conn = sqlite3.connect(db_path)
+    problems: list[tuple[str, str]] = []
+
+    for sql in dict.fromkeys(statements):
+        if not sql.lstrip().upper().startswith(PLANNED_PREFIXES):
+            continue
+
+        plan = [detail for _, _, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+        # CTEs and subqueries are scanned too, but they are not tables.
+        derived = {
+            detail.split(" ", 1)[1]
+            for detail in plan
+            if detail.startswith(("MATERIALIZE ", "CO-ROUTINE "))
+        }
+
+        for detail in plan:
+            if not detail.startswith("SCAN "):
+                continue
+            # "SCAN t" and "SCAN t USING COVERING INDEX i" both read every row.
+            name = detail.split(" ")[1]
+            if name in derived or name.startswith("(") or "CONSTANT ROW" in detail:
+                continue
+            problems.append((" ".join(sql.split()), detail))
+
+    conn.close()
+    return problems
+
+
+def main() -> int:
+    original_path = store.DB_PATH
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "synthetic.db"
+        try:
+            print("[INFO] Building synthetic multi-year DB...")
+            build_synthetic_db(db_path)
+            problems = full_scans(db_path)
+        finally:
+            store.DB_PATH = original_path
+
+    if problems:
+        for sql, detail in problems:
+            print(f"[ERROR] Full table scan: {detail}\n        {sql}")
+        return 1
+
+    print("[INFO] All store queries use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
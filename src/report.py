@@ -4,7 +4,7 @@ from collections import defaultdict
 from datetime import date
 
 from src.store import (
-    get_weekend_history,
+    get_weekend_summaries,
     get_latest_learning_opportunities,
 )
 
@@ -91,44 +91,22 @@ def _best_combo_price(outbound_rows: list[dict], inbound_rows: list[dict]) -> fl
     return out_best + in_best
 
 
-def _find_previous_and_history(
-    weekend_outbound: date,
-    weekend_inbound: date,
-) -> dict[str, float | None | list[dict]]:
-    history = get_weekend_history(weekend_outbound, weekend_inbound)
-
-    if not history:
-        return {
-            "outbound_today": None,
-            "inbound_today": None,
-            "combo_today": None,
-            "outbound_prev": None,
-            "inbound_prev": None,
-            "combo_prev": None,
-            "outbound_hist_min": None,
-            "inbound_hist_min": None,
-            "combo_hist_min": None,
-            "history_rows": [],
-        }
-
-    today_row = history[-1]
-    prev_row = history[-2] if len(history) >= 2 else None
-
-    outbound_hist_values = [r["best_outbound"] for r in history if r["best_outbound"] is not None]
-    inbound_hist_values = [r["best_inbound"] for r in history if r["best_inbound"] is not None]
-    combo_hist_values = [r["best_combo"] for r in history if r["best_combo"] is not None]
+def _find_previous_and_history(summary: dict) -> dict[str, float | None | list[dict]]:
+    """Report view of one `get_weekend_summaries` entry."""
+    today_row = summary["latest"]
+    prev_row = summary["previous"]
 
     return {
-        "outbound_today": today_row["best_outbound"],
-        "inbound_today": today_row["best_inbound"],
-        "combo_today": today_row["best_combo"],
+        "outbound_today": today_row["best_outbound"] if today_row else None,
+        "inbound_today": today_row["best_inbound"] if today_row else None,
+        "combo_today": today_row["best_combo"] if today_row else None,
         "outbound_prev": prev_row["best_outbound"] if prev_row else None,
         "inbound_prev": prev_row["best_inbound"] if prev_row else None,
         "combo_prev": prev_row["best_combo"] if prev_row else None,
-        "outbound_hist_min": min(outbound_hist_values) if outbound_hist_values else None,
-        "inbound_hist_min": min(inbound_hist_values) if inbound_hist_values else None,
-        "combo_hist_min": min(combo_hist_values) if combo_hist_values else None,
-        "history_rows": history[-6:],
+        "outbound_hist_min": summary["min_outbound"],
+        "inbound_hist_min": summary["min_inbound"],
+        "combo_hist_min": summary["min_combo"],
+        "history_rows": summary["history_rows"],
     }
 
 
@@ -360,8 +338,43 @@ def _build_history_table(summary: dict) -> str:
     return html
 
 
-def build_html_report(run_date, rows):
+def _build_stale_weekend_block(
+    weekend_outbound: date,
+    weekend_inbound: date,
+    summary: dict,
+    reason: str = "price stable",
+) -> str:
+    history_rows = summary.get("history_rows", [])
+    last_checked = history_rows[-1]["run_date"] if history_rows else "—"
+
+    return f"""
+      <div style="margin:12px; border:1px dashed #d0d0d0; border-radius:10px; overflow:hidden; background:#fcfcfc;">
+        <div style="padding:12px 14px; border-bottom:1px solid #ececec;">
+          <div style="font-size:18px; font-weight:700; color:#555;">
+            Weekend starting {weekend_outbound.isoformat()} ({_fmt_day(weekend_outbound)} → {_fmt_day(weekend_inbound)})
+            <span style="font-size:12px; font-weight:700; color:#b54708; margin-left:8px;">STALE</span>
+          </div>
+          <div style="margin-top:4px; font-size:12px; color:#666;">
+            Not refreshed today ({reason}). Last checked {last_checked}.
+          </div>
+
+          <div style="margin-top:8px; display:flex; gap:18px; flex-wrap:wrap; font-size:13px; color:#555;">
+            <div>Last outbound: <strong>{_fmt_price(summary["outbound_today"])}</strong></div>
+            <div>Last inbound: <strong>{_fmt_price(summary["inbound_today"])}</strong></div>
+            <div>Last combo: <strong>{_fmt_price(summary["combo_today"])}</strong></div>
+          </div>
+        </div>
+
+        {_build_history_table(summary)}
+      </div>
+    """
+
+
+def build_html_report(run_date, rows, stale_pairs=None, skipped_pairs=None):
     grouped = _group_rows(rows)
+    # Weekends the time budget did not reach are shown like stale ones.
+    skipped_pairs = {p for p in (skipped_pairs or []) if p not in grouped}
+    stale_pairs = [p for p in (stale_pairs or []) if p not in grouped] + sorted(skipped_pairs)
 
     all_outbound_rows = [r for r in rows if r.get("leg_type") == "outbound"]
     all_inbound_rows = [r for r in rows if r.get("leg_type") == "inbound"]
@@ -395,7 +408,7 @@ def build_html_report(run_date, rows):
             <div style="margin-top:12px; display:grid; grid-template-columns:repeat(4,1fr); gap:8px;">
               <div style="padding:10px; border:1px solid #eee; background:#fafafa;">
                 <div style="font-size:11px; color:#666;">Weekends</div>
-                <div style="font-size:18px; font-weight:700;">{len(grouped)}</div>
+                <div style="font-size:18px; font-weight:700;">{len(grouped) + len(stale_pairs)}</div>
               </div>
 
               <div style="padding:10px; border:1px solid #eee; background:#fafafa;">
@@ -418,7 +431,7 @@ def build_html_report(run_date, rows):
 
     html += _build_long_range_opportunities()
 
-    if not rows:
+    if not rows and not stale_pairs:
         html += """
           <div style="padding:20px;">
             <div style="font-size:18px; font-weight:700;">No flights found</div>
@@ -427,14 +440,28 @@ def build_html_report(run_date, rows):
         html += "</div></body></html>"
         return html
 
-    for weekend_key in sorted(grouped.keys(), key=lambda x: (x[0], x[1])):
+    weekend_keys = sorted(set(grouped) | set(stale_pairs), key=lambda x: (x[0], x[1]))
+    # One bulk history query for the scanned weekends. Stale ones carry their
+    # last priced run forward, the same row the scan scheduler judged them on.
+    summaries = get_weekend_summaries(list(grouped), last_n=6)
+    if stale_pairs:
+        summaries.update(get_weekend_summaries(stale_pairs, last_n=6, before=run_date, priced_only=True))
+
+    for weekend_key in weekend_keys:
         weekend_outbound, weekend_inbound = weekend_key
+
+        if weekend_key not in grouped:
+            summary = _find_previous_and_history(summaries[weekend_key])
+            reason = "time budget ran out" if weekend_key in skipped_pairs else "price stable"
+            html += _build_stale_weekend_block(weekend_outbound, weekend_inbound, summary, reason=reason)
+            continue
+
         weekend_data = grouped[weekend_key]
 
         outbound_routes = weekend_data["outbound"]
         inbound_routes = weekend_data["inbound"]
 
-        summary = _find_previous_and_history(weekend_outbound, weekend_inbound)
+        summary = _find_previous_and_history(summaries[weekend_key])
 
         outbound_flat = _flatten_leg_groups(outbound_routes)
         inbound_flat = _flatten_leg_groups(inbound_routes)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import time
+from datetime import date
+from threading import Lock
+
+from src.store import clear_leg_progress, get_leg_progress, save_leg_progress, save_skipped_legs
+
+
+# Held back from --time-budget: a leg started just before the deadline may
+# still need its full timeout, and the report and email come after that.
+BUDGET_RESERVE_S = 120
+
+
+class RunProgress:
+    """
+    Legs completed so far for one run_date.
+
+    Every leg is written to the run_progress table as soon as it has been
+    parsed; rows of earlier run_dates are dropped on start. With resume=True
+    the legs already stored for run_date are reused instead of being scraped
+    again. With a time budget, `deadline` is the
+    time.monotonic() after which scrapers stop starting new legs; the legs
+    they leave behind are recorded in `out_of_time` and in skipped_legs.
+    """
+
+    def __init__(
+        self,
+        run_date: date,
+        resume: bool = False,
+        time_budget_s: float | None = None,
+    ) -> None:
+        self.run_date = run_date
+
+        # Checkpoints are only useful for this run_date; older ones would
+        # otherwise pile up in the cached DB.
+        try:
+            clear_leg_progress(run_date, keep_current=resume)
+        except Exception as e:
+            print(f"[ERROR] Clearing old run progress: {e}")
+
+        self._done: dict[tuple[str, str, date, bool], list[dict]] = (
+            get_leg_progress(run_date) if resume else {}
+        )
+        self._lock = Lock()
+
+        self.deadline: float | None = None
+        if time_budget_s is not None:
+            self.deadline = time.monotonic() + max(time_budget_s - BUDGET_RESERVE_S, 0)
+        self.out_of_time: set[tuple[str, str, date, bool]] = set()
+
+        if resume:
+            print(f"[INFO] Resuming {run_date}: {len(self._done)} legs already done")
+
+    def completed(self, cache_key: tuple[str, str, date, bool]) -> list[dict] | None:
+        with self._lock:
+            return self._done.get(cache_key)
+
+    def record(self, cache_key: tuple[str, str, date, bool], rows: list[dict]) -> None:
+        origin, destination, leg_date, allow_klm_from_ams = cache_key
+
+        try:
+            save_leg_progress(self.run_date, origin, destination, leg_date, allow_klm_from_ams, rows)
+        except Exception as e:
+            print(f"[ERROR] Saving progress for {origin}->{destination} {leg_date}: {e}")
+            return
+
+        with self._lock:
+            self._done[cache_key] = rows
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def time_left(self) -> float | None:
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def record_skipped(self, cache_keys: list[tuple[str, str, date, bool]], reason: str) -> None:
+        if not cache_keys:
+            return
+
+        if reason == "time_budget":
+            with self._lock:
+                self.out_of_time.update(cache_keys)
+
+        try:
+            save_skipped_legs(self.run_date, cache_keys, reason)
+        except Exception as e:
+            print(f"[ERROR] Saving skipped legs: {e}")
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from datetime import date
+from statistics import mean, pstdev
+from typing import List, Tuple
+
+from src.store import get_weekend_summaries
+
+
+# Weekends this close to departure are refreshed every run, no matter what.
+ALWAYS_REFRESH_DAYS = 21
+
+# Refresh intervals (days since the last real observation).
+HOT_REFRESH_DAYS = 1       # volatile or at/near the historical min
+NEAR_REFRESH_DAYS = 2      # departing within NEAR_DEPARTURE_DAYS
+STABLE_REFRESH_DAYS = 4    # everything else
+
+NEAR_DEPARTURE_DAYS = 35
+VOLATILITY_WINDOW = 5
+VOLATILE_CV = 0.05         # stdev / mean of the recent combos
+NEAR_MIN_RATIO = 1.05
+
+
+def _refresh_interval(summary: dict, days_to_departure: int) -> int:
+    # Summaries are priced-only, so history_rows are the recent combos.
+    recent = [r["best_combo"] for r in summary["history_rows"]]
+
+    if recent:
+        if len(recent) >= 2 and mean(recent) > 0 and pstdev(recent) / mean(recent) >= VOLATILE_CV:
+            return HOT_REFRESH_DAYS
+
+        # A price that has never moved is trivially "at its min"; only count
+        # it when the weekend has actually been more expensive before.
+        if summary["max_combo"] > summary["min_combo"] and recent[-1] <= summary["min_combo"] * NEAR_MIN_RATIO:
+            return HOT_REFRESH_DAYS
+
+    if days_to_departure <= NEAR_DEPARTURE_DAYS:
+        return NEAR_REFRESH_DAYS
+
+    return STABLE_REFRESH_DAYS
+
+
+def _priced_history(run_date: date, pairs: List[Tuple[date, date]]) -> dict:
+    # Only rows with a price count as an observation; a failed scrape
+    # should not make a weekend look fresh.
+    return get_weekend_summaries(
+        pairs,
+        last_n=VOLATILITY_WINDOW,
+        before=run_date,
+        priced_only=True,
+    )
+
+
+def plan_incremental_scan(
+    run_date: date,
+    pairs: List[Tuple[date, date]],
+) -> tuple[list[tuple[date, date]], list[tuple[date, date]]]:
+    """
+    Split weekend pairs into (refresh, stale) based on weekend_prices history.
+
+    Stale pairs are not scraped and get no snapshot today, so their history
+    only ever contains real observations; the report carries their last
+    known price forward and marks it as stale.
+    """
+    refresh: list[tuple[date, date]] = []
+    stale: list[tuple[date, date]] = []
+    summaries = _priced_history(run_date, pairs)
+
+    for outbound, inbound in pairs:
+        days_to_departure = (outbound - run_date).days
+        summary = summaries[(outbound, inbound)]
+
+        if days_to_departure <= ALWAYS_REFRESH_DAYS or summary["latest"] is None:
+            refresh.append((outbound, inbound))
+            continue
+
+        last_seen = date.fromisoformat(summary["latest"]["run_date"])
+        age_days = (run_date - last_seen).days
+
+        if age_days >= _refresh_interval(summary, days_to_departure):
+            refresh.append((outbound, inbound))
+        else:
+            stale.append((outbound, inbound))
+
+    print(f"[INFO] Incremental scan: refreshing {len(refresh)} pairs, {len(stale)} carried forward")
+    return refresh, stale
+
+
+def prioritize_pairs(
+    run_date: date,
+    pairs: List[Tuple[date, date]],
+) -> list[tuple[date, date]]:
+    """
+    Order pairs by how much a fresh price is worth when time is short:
+    weekends within ALWAYS_REFRESH_DAYS first (nearest first), then the
+    rest by recent volatility, most volatile (or never seen) first.
+    """
+    summaries = _priced_history(run_date, pairs)
+
+    def _key(pair: tuple[date, date]) -> tuple:
+        outbound, inbound = pair
+        if (outbound - run_date).days <= ALWAYS_REFRESH_DAYS:
+            return (0, 0.0, outbound, inbound)
+
+        combos = [r["best_combo"] for r in summaries[pair]["history_rows"]]
+
+        if len(combos) < 2 or mean(combos) <= 0:
+            return (1, float("-inf"), outbound, inbound)
+        return (1, -pstdev(combos) / mean(combos), outbound, inbound)
+
+    return sorted(pairs, key=_key)
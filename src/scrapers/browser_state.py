@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+
+
+# Cookies/localStorage saved after the first consent click, so later
+# contexts (and later runs, via the workflow cache) start past the wall.
+STORAGE_STATE_PATH = Path(os.environ.get("BROWSER_STATE_PATH", "data/browser_state.json"))
+
+CONSENT_URL_MARKERS = [
+    "consent.google.",
+    "consent.skyscanner.",
+]
+
+CONSENT_TEXT_MARKERS = [
+    "Before you continue",
+    "Antes de ir a",
+    "Accept all",
+    "Aceptar todo",
+    "Reject all",
+    "Proceed anyway",
+    "Continue anyway",
+]
+
+_save_lock = threading.Lock()
+
+
+def storage_state_kwargs() -> dict:
+    """Extra `browser.new_context` kwargs to start from the saved state."""
+    if STORAGE_STATE_PATH.exists():
+        return {"storage_state": str(STORAGE_STATE_PATH)}
+    return {}
+
+
+def save_storage_state(context) -> None:
+    # Several browser workers may pass the consent wall at the same time;
+    # write to a temp file and swap it in so readers never see half a file.
+    with _save_lock:
+        try:
+            STORAGE_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = STORAGE_STATE_PATH.with_name(
+                f"{STORAGE_STATE_PATH.name}.{os.getpid()}.tmp"
+            )
+            context.storage_state(path=str(tmp_path))
+            os.replace(tmp_path, STORAGE_STATE_PATH)
+            print(f"[INFO] Saved browser storage state to {STORAGE_STATE_PATH}")
+        except Exception as e:
+            print(f"[ERROR] Could not save browser storage state: {e}")
+
+
+def consent_wall_detected(page) -> bool:
+    try:
+        if any(marker in page.url for marker in CONSENT_URL_MARKERS):
+            return True
+    except Exception:
+        pass
+
+    try:
+        text = page.inner_text("body", timeout=2000)
+    except Exception:
+        return False
+
+    return any(marker in text for marker in CONSENT_TEXT_MARKERS)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import atexit
+import gzip
+import os
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+
+try:
+    import zstandard
+except ImportError:  # optional: falls back to gzip
+    zstandard = None
+
+
+# When to keep per-leg debug artifacts:
+# - "always": every leg
+# - "on_failure": legs that raised (timeouts, crashes)
+# - "zero_rows": failures plus legs where nothing could be parsed
+# - "sample": failures plus DEBUG_SAMPLE_PERCENT % of the other legs
+# - "off": never
+DEBUG_POLICY = os.environ.get("DEBUG_POLICY", "zero_rows")
+DEBUG_SAMPLE_PERCENT = float(os.environ.get("DEBUG_SAMPLE_PERCENT", "10"))
+
+# "gzip", "zstd" or "none". Applies to text/HTML; screenshots are already PNG.
+DEBUG_COMPRESSION = os.environ.get("DEBUG_COMPRESSION", "gzip")
+
+
+def should_capture(
+    label: str,
+    failed: bool = False,
+    zero_rows: bool = False,
+    policy: str | None = None,
+    sample_percent: float | None = None,
+) -> bool:
+    policy = DEBUG_POLICY if policy is None else policy
+    sample_percent = DEBUG_SAMPLE_PERCENT if sample_percent is None else sample_percent
+
+    if policy == "off":
+        return False
+    if policy == "always" or failed:
+        return True
+    if policy == "zero_rows":
+        return zero_rows
+    if policy == "sample":
+        # Hash-based so the same legs are sampled on a rerun.
+        return zlib.crc32(label.encode("utf-8")) % 10000 < sample_percent * 100
+    return False
+
+
+def _compress(data: bytes, compression: str) -> tuple[bytes, str]:
+    if compression == "zstd":
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=10).compress(data), ".zst"
+        compression = "gzip"
+
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=6), ".gz"
+
+    return data, ""
+
+
+class DebugWriter:
+    """
+    Compress and write debug artifacts on a background thread so the browser
+    can move on to the next leg while the previous one is being written.
+    """
+
+    def __init__(self, compression: str | None = None) -> None:
+        self.compression = DEBUG_COMPRESSION if compression is None else compression
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="debug-writer")
+        self._pending: list[Future] = []
+        self._lock = Lock()
+
+    def _write(self, path: Path, data: bytes, compress: bool) -> None:
+        suffix = ""
+        if compress:
+            data, suffix = _compress(data, self.compression)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.with_name(path.name + suffix).write_bytes(data)
+
+    def write(self, path: Path, data: str | bytes, compress: bool = True) -> None:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        future = self._executor.submit(self._write, path, data, compress)
+        with self._lock:
+            self._pending.append(future)
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        for future in pending:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"[ERROR] Writing debug artifact: {e}")
+
+
+DEBUG_WRITER = DebugWriter()
+atexit.register(DEBUG_WRITER.flush)
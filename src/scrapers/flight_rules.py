@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import re
+from datetime import date, datetime, time
+
+
+# The flights the bot cares about, shared by every provider so rows are
+# filtered the same way whichever source found them.
+ALLOWED_AIRLINES = {"vueling", "transavia"}
+# KLM only counts when allow_klm_from_ams is set and the leg touches AMS.
+KLM_AIRPORT = "AMS"
+
+MIN_PRICE = 30
+MAX_PRICE = 2000
+
+# Thursday outbound and Sunday inbound from this time; Friday and Monday
+# legs all day.
+EVENING_FROM = time(16, 0)
+
+# A euro amount next to "€" or "EUR", on either side; a clock like
+# "18:10 €89" is not an amount.
+_PRICE_RE = re.compile(r"(?:€|EUR)\s?(\d[\d.,]*)|(?<![\d:.,])(\d[\d.,]*)\s?(?:€|EUR)")
+
+
+def parse_clock(value: str) -> time | None:
+    """'4:05 PM', '4:05 PM+1' or '16:05' -> time, None if unreadable."""
+    value = value.strip().upper().replace("\u202f", " ").replace("\xa0", " ")
+    value = value.replace("+1", "").strip()
+
+    for fmt in ("%I:%M %p", "%H:%M"):
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            pass
+
+    return None
+
+
+def format_clock(value: time | datetime) -> str:
+    """The '4:05 PM' format the Google Flights scraper produces."""
+    return value.strftime("%I:%M %p").lstrip("0")
+
+
+def parse_price(text: str) -> float | None:
+    """
+    First euro price in `text`: '89,99 €' and '€89.99' -> 89.99,
+    '1.234 €' -> 1234.0. A final separator followed by one or two digits
+    is the decimal point; every other separator groups thousands.
+    """
+    for m in _PRICE_RE.finditer(text):
+        raw = (m.group(1) or m.group(2)).rstrip(".,")
+        parts = re.fullmatch(r"([\d.,]*?)(?:[.,](\d{1,2}))?", raw)
+        whole = re.sub(r"[.,]", "", parts.group(1))
+        if whole:
+            return float(f"{whole}.{parts.group(2) or 0}")
+
+    return None
+
+
+def departure_ok(leg_date: date, departure_time: str) -> bool:
+    if leg_date.weekday() in (4, 0):  # Friday or Monday
+        return True
+
+    dep = parse_clock(departure_time)
+    return dep is not None and dep >= EVENING_FROM
+
+
+def airline_ok(airline: str, origin: str, destination: str, allow_klm_from_ams: bool = False) -> bool:
+    airline = airline.lower()
+    if airline == "klm":
+        return allow_klm_from_ams and KLM_AIRPORT in (origin, destination)
+    return airline in ALLOWED_AIRLINES
+
+
+def price_ok(price: float) -> bool:
+    return MIN_PRICE <= price <= MAX_PRICE
+
+
+def flight_ok(
+    origin: str,
+    destination: str,
+    leg_date: date,
+    airline: str,
+    departure_time: str,
+    price: float,
+    allow_klm_from_ams: bool = False,
+) -> bool:
+    """Nonstop flight worth keeping; providers check nonstop while parsing."""
+    return (
+        airline_ok(airline, origin, destination, allow_klm_from_ams)
+        and departure_ok(leg_date, departure_time)
+        and price_ok(price)
+    )
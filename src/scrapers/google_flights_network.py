@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import json
+import re
+from datetime import date
+
+
+# XHR the Google Flights frontend uses to fetch (and refresh) search results.
+SHOPPING_RESULTS_MARKERS = [
+    "FlightsFrontendService/GetShoppingResults",
+    "FlightsFrontendService/GetBookingResults",
+]
+
+# XHRs behind the date grid / price graph (lowest price per departure date).
+CALENDAR_MARKERS = [
+    "FlightsFrontendService/GetCalendarPicker",
+    "FlightsFrontendService/GetCalendarGraph",
+]
+
+_ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+class ResponseCapture:
+    """
+    Collect the responses matching `markers` (search results by default)
+    that a page fetches while it loads.
+
+    Bodies are only read in `payloads()`, after navigation has settled, so the
+    `response` event handler itself does no IPC.
+    """
+
+    def __init__(self, page, markers: list[str] | None = None) -> None:
+        self._page = page
+        self._markers = SHOPPING_RESULTS_MARKERS if markers is None else markers
+        self._responses: list = []
+
+    def _on_response(self, response) -> None:
+        if any(marker in response.url for marker in self._markers):
+            self._responses.append(response)
+
+    def __enter__(self) -> ResponseCapture:
+        self._page.on("response", self._on_response)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            self._page.remove_listener("response", self._on_response)
+        except Exception:
+            pass
+
+    def payloads(self) -> list[str]:
+        bodies: list[str] = []
+        for response in self._responses:
+            try:
+                bodies.append(response.text())
+            except Exception:
+                pass
+        return bodies
+
+
+def _decode_envelope(body: str) -> list:
+    """
+    Google's batchexecute envelope: a `)]}'` guard, then length-prefixed
+    chunks of `[["wrb.fr", null, "<json string>"], ...]`. Returns the decoded
+    inner payloads.
+    """
+    inner: list = []
+
+    if body.startswith(")]}'"):
+        body = body[4:]
+
+    for line in body.splitlines():
+        line = line.strip()
+        if not line.startswith("["):
+            continue
+
+        try:
+            chunk = json.loads(line)
+        except ValueError:
+            continue
+
+        for entry in chunk if isinstance(chunk, list) else []:
+            if (
+                isinstance(entry, list)
+                and len(entry) >= 3
+                and entry[0] == "wrb.fr"
+                and isinstance(entry[2], str)
+            ):
+                try:
+                    inner.append(json.loads(entry[2]))
+                except ValueError:
+                    pass
+
+    return inner
+
+
+def _clock_minutes(value) -> int | None:
+    # [16, 5] -> 965. Google omits zero values, so [None, 20] is 00:20 and
+    # [16] is 16:00.
+    if not isinstance(value, list):
+        return None
+
+    hour = int(value[0]) if len(value) > 0 and value[0] is not None else 0
+    minute = int(value[1]) if len(value) > 1 and value[1] is not None else 0
+    return hour * 60 + minute
+
+
+def _fmt_clock(value) -> str | None:
+    # [16, 5] -> "4:05 PM"
+    minutes = _clock_minutes(value)
+    if minutes is None:
+        return None
+
+    hour, minute = divmod(minutes, 60)
+    suffix = "AM" if hour < 12 else "PM"
+    hour_12 = hour % 12 or 12
+    return f"{hour_12}:{minute:02d} {suffix}"
+
+
+def _fmt_duration(minutes) -> str | None:
+    if not isinstance(minutes, int):
+        return None
+
+    hours, mins = divmod(minutes, 60)
+    if mins:
+        return f"{hours} hr {mins} min"
+    return f"{hours} hr"
+
+
+def _fmt_stops(legs: list) -> str:
+    stops = len(legs) - 1
+    if stops <= 0:
+        return "Nonstop"
+    if stops == 1:
+        return "1 stop"
+    return f"{stops} stops"
+
+
+def _flight_numbers(legs: list) -> str:
+    numbers: list[str] = []
+
+    for leg in legs:
+        try:
+            code, number = leg[22][0], leg[22][1]
+        except (IndexError, TypeError):
+            continue
+        if code and number:
+            numbers.append(f"{code}{number}")
+
+    return " / ".join(numbers) if numbers else "N/A"
+
+
+def _decode_itinerary(item, origin: str, destination: str) -> dict | None:
+    try:
+        flight = item[0]
+        price = item[1][0][-1]
+        airlines = flight[1]
+        legs = flight[2]
+        dep_airport = flight[3]
+        dep_time = _fmt_clock(flight[5])
+        arr_airport = flight[6]
+        arr_time = _fmt_clock(flight[8])
+        # Arrivals past midnight carry "+1", like the text parser's rows.
+        if dep_time and arr_time and _clock_minutes(flight[8]) < _clock_minutes(flight[5]):
+            arr_time += "+1"
+        duration = _fmt_duration(flight[9])
+    except (IndexError, TypeError):
+        return None
+
+    if dep_airport != origin or arr_airport != destination:
+        return None
+    if not isinstance(price, (int, float)) or dep_time is None or arr_time is None:
+        return None
+    if not isinstance(legs, list) or not legs:
+        return None
+
+    airline = airlines[0] if isinstance(airlines, list) and airlines else "Unknown"
+    stops = _fmt_stops(legs)
+    flight_no = _flight_numbers(legs)
+
+    return {
+        "airline": airline,
+        "departure_time": dep_time,
+        "arrival_time": arr_time,
+        "duration": duration or "N/A",
+        "stops": stops,
+        "price": float(price),
+        "flight_no": flight_no,
+        "raw_block": (
+            f"{dep_time} - {arr_time} | {airline} | {flight_no} | "
+            f"{duration} | {origin}-{destination} | {stops} | €{price}"
+        ),
+    }
+
+
+def extract_rows_from_payloads(bodies: list[str], origin: str, destination: str) -> list[dict]:
+    """
+    Decode captured GetShoppingResults bodies into the same row dicts that
+    the text parser (`_extract_flight_blocks`) returns, plus `flight_no`.
+    """
+    rows: list[dict] = []
+    seen: set[tuple] = set()
+
+    for body in bodies:
+        for payload in _decode_envelope(body):
+            # Index 2 holds the "best flights" block, index 3 "other flights".
+            for section_index in (2, 3):
+                try:
+                    items = payload[section_index][0]
+                except (IndexError, TypeError):
+                    continue
+
+                for item in items or []:
+                    row = _decode_itinerary(item, origin, destination)
+                    if row is None:
+                        continue
+
+                    key = (
+                        row["airline"],
+                        row["departure_time"],
+                        row["arrival_time"],
+                        row["stops"],
+                        row["price"],
+                    )
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    rows.append(row)
+
+    return rows
+
+
+def _find_price(value, depth: int = 0) -> float | None:
+    # Prices are encoded as [null, <amount>] somewhere under the date entry.
+    if depth > 4 or not isinstance(value, list):
+        return None
+
+    if len(value) == 2 and value[0] is None and isinstance(value[1], (int, float)):
+        return float(value[1])
+
+    for child in value:
+        price = _find_price(child, depth + 1)
+        if price is not None:
+            return price
+
+    return None
+
+
+def _walk_calendar_entries(value, prices: dict[date, float]) -> None:
+    if not isinstance(value, list):
+        return
+
+    if value and isinstance(value[0], str) and _ISO_DATE_RE.match(value[0]):
+        price = _find_price(value[1:])
+        if price is not None:
+            day = date.fromisoformat(value[0])
+            if day not in prices or price < prices[day]:
+                prices[day] = price
+        return
+
+    for child in value:
+        _walk_calendar_entries(child, prices)
+
+
+def extract_calendar_prices(bodies: list[str]) -> dict[date, float]:
+    """
+    Decode captured calendar responses into {departure date: lowest price}.
+    The entries look like ["2026-05-14", ..., [[null, 89], ...]]; the walk
+    does not depend on their exact position in the payload.
+    """
+    prices: dict[date, float] = {}
+
+    for body in bodies:
+        for payload in _decode_envelope(body):
+            _walk_calendar_entries(payload, prices)
+
+    return prices
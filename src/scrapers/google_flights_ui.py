@@ -1,14 +1,88 @@
 from __future__ import annotations
 
+import multiprocessing
+import os
+import queue
 import re
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Tuple
-from datetime import date, datetime
+from urllib.parse import quote
+from datetime import date
 
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 
+from src.run_progress import RunProgress
+from src.scrapers.browser_state import consent_wall_detected, save_storage_state, storage_state_kwargs
+from src.scrapers.debug_artifacts import DEBUG_WRITER, should_capture
+from src.scrapers.flight_rules import flight_ok, parse_clock
+from src.scrapers.google_flights_network import (
+    CALENDAR_MARKERS,
+    ResponseCapture,
+    extract_calendar_prices,
+    extract_rows_from_payloads,
+)
+from src.scrapers.leg_pipeline import ParsePipeline
+from src.scrapers.leg_scheduler import LEG_TIMEOUT_MS, LegScheduler
+from src.scrapers.rate_limiter import RATE_LIMITER, checked_goto, throttled_goto
+from src.scrapers.resource_blocking import install_resource_blocking
+
 
 DEBUG_DIR = Path("debug")
+AIRPORTS = ["AMS", "RTM"]
+
+# Readiness polling: results are considered rendered once the body text has
+# been identical for WAIT_STABLE_POLLS consecutive polls.
+RESULTS_SELECTOR = "ul[role='list'] li, [role='main'] [role='listitem']"
+WAIT_POLL_MS = 500
+WAIT_STABLE_POLLS = 2
+
+# Extraction order per mode, first non-empty result wins:
+# "network": search XHR payloads -> in-page result cards -> body text
+# "dom":     in-page result cards -> body text
+# "text":    body text only
+EXTRACTION_MODE = os.environ.get("GOOGLE_FLIGHTS_EXTRACTION", "network")
+
+# Result cards expose a full sentence as aria-label, e.g.
+# "From 89 euros. Nonstop flight with Vueling. Leaves ... at 4:05 PM on ...
+#  and arrives at ... at 6:20 PM on .... Total duration 2 hr 15 min."
+_EXTRACT_CARDS_JS = """
+() => {
+  const cards = [];
+  const seen = new Set();
+  const pick = (re, text) => {
+    const m = text.match(re);
+    return m ? m[1].trim() : null;
+  };
+
+  for (const el of document.querySelectorAll("[aria-label]")) {
+    const label = el.getAttribute("aria-label") || "";
+    if (!/^From [\\d.,]+ euros?/.test(label) || !/Leaves /.test(label) || seen.has(label)) {
+      continue;
+    }
+    seen.add(label);
+
+    const card = el.closest("li") || el;
+    const link = card.querySelector("a[href]");
+
+    cards.push({
+      label,
+      price: pick(/^From ([\\d.,]+) euros?/, label),
+      stops: pick(/(Nonstop|\\d+ stops?) flight/, label),
+      airline: pick(/flight with ([^.]+)\\./, label),
+      departure_time: pick(/Leaves .*? at (\\d{1,2}:\\d{2}\\s?[AP]M)/, label),
+      arrival_time: pick(/arrives at .*? at (\\d{1,2}:\\d{2}\\s?[AP]M)/, label),
+      duration: pick(/Total duration ([^.]+)\\./, label),
+      href: link ? link.href : null,
+    });
+  }
+
+  return cards;
+}
+"""
 
 
 def _safe_name(text: str) -> str:
@@ -23,6 +97,15 @@ def _build_google_flights_url(origin: str, destination: str, leg_date: str) -> s
     )
 
 
+def _build_airline_search_url(origin: str, destination: str, leg_date: str, airline: str) -> str:
+    # Not a link to the flight itself: the leg search narrowed to nonstop on
+    # the airline, for rows without a card href.
+    return (
+        _build_google_flights_url(origin, destination, leg_date)
+        + f"%20nonstop%20on%20{quote(airline)}"
+    )
+
+
 def _click_if_present(page, selectors: list[str], timeout: int = 2500) -> bool:
     for selector in selectors:
         try:
@@ -35,8 +118,8 @@ def _click_if_present(page, selectors: list[str], timeout: int = 2500) -> bool:
     return False
 
 
-def _maybe_handle_google_interstitials(page) -> None:
-    _click_if_present(
+def _maybe_handle_google_interstitials(page) -> bool:
+    return _click_if_present(
         page,
         [
             "button:has-text('Accept all')",
@@ -61,47 +144,67 @@ def _collect_page_text(page) -> str:
         return ""
 
 
-def _normalize_text(text: str) -> str:
-    return (
-        text.replace("\u202f", " ")
-        .replace("\xa0", " ")
-        .replace("–", "-")
-        .replace("—", "-")
-    )
+def _results_visible(page, page_text: str) -> bool:
+    try:
+        if page.locator(RESULTS_SELECTOR).count() > 0:
+            return True
+    except Exception:
+        pass
 
+    lines = _prepare_lines(page_text)
+    has_time = any(_is_time_line(line) for line in lines)
+    has_price = any(_extract_price_from_line(line) is not None for line in lines)
+    return has_time and has_price
 
-def _parse_time_to_24h(value: str) -> datetime.time | None:
-    value = value.strip().upper().replace("\u202f", " ").replace("\xa0", " ")
-    value = value.replace("+1", "").strip()
 
-    for fmt in ("%I:%M %p", "%H:%M"):
-        try:
-            return datetime.strptime(value, fmt).time()
-        except ValueError:
-            pass
+def _wait_for_stable_results(
+    page,
+    ceiling_ms: int,
+    label: str,
+    require_results: bool = True,
+) -> int:
+    """
+    Poll the page until the body text stops changing (and, if required,
+    flight results are visible). `ceiling_ms` is the old fixed sleep and is
+    only reached when the page never settles. Returns the waited time in ms.
+    """
+    start = time.monotonic()
+    previous_text = None
+    stable_polls = 0
+    reason = "ceiling"
 
-    return None
+    while True:
+        elapsed_ms = int((time.monotonic() - start) * 1000)
+        if elapsed_ms >= ceiling_ms:
+            break
 
+        page_text = _collect_page_text(page)
+        if page_text and page_text == previous_text:
+            stable_polls += 1
+        else:
+            stable_polls = 0
+        previous_text = page_text
 
-def _departure_ok(leg_date: date, departure_time: str) -> bool:
-    """
-    Rules:
-    - Thursday outbound -> from 16:00
-    - Friday outbound -> whole day
-    - Sunday inbound -> from 16:00
-    - Monday inbound -> whole day
-    """
-    weekday = leg_date.weekday()
+        if stable_polls >= WAIT_STABLE_POLLS and (
+            not require_results or _results_visible(page, page_text)
+        ):
+            reason = "stable"
+            break
 
-    if weekday in (4, 0):  # Friday or Monday
-        return True
+        page.wait_for_timeout(min(WAIT_POLL_MS, max(ceiling_ms - elapsed_ms, 1)))
 
-    dep = _parse_time_to_24h(departure_time)
-    if dep is None:
-        return False
+    elapsed_ms = int((time.monotonic() - start) * 1000)
+    print(f"[INFO] Wait {label}: {elapsed_ms} ms ({reason}, ceiling {ceiling_ms} ms)")
+    return elapsed_ms
 
-    threshold = datetime.strptime("16:00", "%H:%M").time()
-    return dep >= threshold
+
+def _normalize_text(text: str) -> str:
+    return (
+        text.replace("\u202f", " ")
+        .replace("\xa0", " ")
+        .replace("–", "-")
+        .replace("—", "-")
+    )
 
 
 def _canonical_airline_name(raw: str) -> str:
@@ -272,59 +375,126 @@ def _extract_flight_blocks(page_text: str, origin: str, destination: str) -> lis
     return deduped
 
 
-def _filter_relevant_flights(
-    rows: list[dict],
-    leg_date: date,
-    origin: str,
-    destination: str,
-    allow_klm_from_ams: bool = False,
-) -> list[dict]:
-    filtered: list[dict] = []
+def _extract_network_rows(bodies: list[str], origin: str, destination: str) -> list[dict]:
+    try:
+        rows = extract_rows_from_payloads(bodies, origin=origin, destination=destination)
+    except Exception as e:
+        print(f"[ERROR] Could not decode network payloads {origin}->{destination}: {e}")
+        return []
 
     for row in rows:
-        airline = row["airline"].lower()
+        row["airline"] = _canonical_airline_name(row["airline"])
 
-        airline_ok = airline in {"vueling", "transavia"}
+    return rows
 
-        if allow_klm_from_ams and airline == "klm":
-            airline_ok = origin == "AMS" or destination == "AMS"
 
-        if not airline_ok:
-            continue
+def _parse_card_price(value) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(str(value).replace(",", ""))
+    except ValueError:
+        return None
 
-        if row["stops"].lower() != "nonstop":
-            continue
 
-        if not _departure_ok(leg_date, row["departure_time"]):
+def _collect_dom_cards(page) -> list[dict]:
+    """
+    One in-page script returning every result card as structured fields,
+    read from the card's accessible label.
+    """
+    try:
+        return page.evaluate(_EXTRACT_CARDS_JS) or []
+    except Exception as e:
+        print(f"[ERROR] In-page card extraction failed: {e}")
+        return []
+
+
+def _extract_dom_rows(cards: list[dict]) -> list[dict]:
+    rows: list[dict] = []
+    seen: set[tuple] = set()
+
+    for card in cards:
+        price = _parse_card_price(card.get("price"))
+        dep_time = _normalize_text(card.get("departure_time") or "").strip()
+        arr_time = _normalize_text(card.get("arrival_time") or "").strip()
+        airline = card.get("airline")
+        stops = card.get("stops")
+
+        if price is None or not dep_time or not arr_time or not airline or not stops:
             continue
 
-        if not (30 <= row["price"] <= 2000):
+        row = {
+            "airline": _canonical_airline_name(airline),
+            "departure_time": dep_time,
+            "arrival_time": arr_time,
+            "duration": card.get("duration") or "N/A",
+            "stops": stops,
+            "price": price,
+            "deep_link": card.get("href"),
+            "raw_block": _normalize_text(card.get("label") or ""),
+        }
+
+        key = (row["airline"], row["departure_time"], row["arrival_time"], row["stops"], row["price"])
+        if key in seen:
             continue
+        seen.add(key)
+        rows.append(row)
+
+    return rows
 
-        filtered.append(row)
+
+def _filter_relevant_flights(
+    rows: list[dict],
+    leg_date: date,
+    origin: str,
+    destination: str,
+    allow_klm_from_ams: bool = False,
+) -> list[dict]:
+    filtered = [
+        row for row in rows
+        if row["stops"].lower() == "nonstop"
+        and flight_ok(
+            origin,
+            destination,
+            leg_date,
+            row["airline"],
+            row["departure_time"],
+            row["price"],
+            allow_klm_from_ams,
+        )
+    ]
 
     filtered.sort(key=lambda r: (r["price"], r["departure_time"]))
     return filtered
 
 
+def _snapshot_page(page, timeout_ms: int = LEG_TIMEOUT_MS) -> dict:
+    # Taken on the browser thread; written later by the parse side.
+    try:
+        return {"screenshot": page.screenshot(full_page=True, timeout=timeout_ms), "html": page.content()}
+    except Exception as e:
+        print(f"[ERROR] Page snapshot failed: {e}")
+        return {}
+
+
 def _save_debug(
-    page,
-    safe_label: str,
-    url: str,
-    response_status: str,
-    page_text: str,
+    fetched: dict,
     parsed_rows: list[dict],
     filtered_rows: list[dict],
 ) -> None:
-    final_url = page.url
-    page_title = page.title()
-
-    screenshot_path = DEBUG_DIR / f"{safe_label}.png"
-    html_path = DEBUG_DIR / f"{safe_label}.html"
-    txt_path = DEBUG_DIR / f"{safe_label}.txt"
-
-    page.screenshot(path=str(screenshot_path), full_page=True)
-    html_path.write_text(page.content(), encoding="utf-8")
+    safe_label = fetched["safe_label"]
+    url = fetched["url"]
+    final_url = fetched["final_url"]
+    page_title = fetched["page_title"]
+    response_status = fetched["status"]
+    page_text = fetched["page_text"]
+
+    # Compression and disk I/O run on the background writer.
+    snapshot = fetched.get("snapshot") or {}
+    if "screenshot" in snapshot:
+        DEBUG_WRITER.write(DEBUG_DIR / f"{safe_label}.png", snapshot["screenshot"], compress=False)
+    if "html" in snapshot:
+        DEBUG_WRITER.write(DEBUG_DIR / f"{safe_label}.html", snapshot["html"])
 
     log_lines = [
         f"REQUEST_URL: {url}",
@@ -357,22 +527,43 @@ def _save_debug(
 
     log_lines.extend(["", "=== PAGE TEXT ===", page_text[:30000]])
 
-    txt_path.write_text("\n".join(log_lines), encoding="utf-8")
+    DEBUG_WRITER.write(DEBUG_DIR / f"{safe_label}.txt", "\n".join(log_lines))
+
+
+# A failed leg's screenshot is taken on the browser thread; after a timeout
+# the page is likely hung, so it gets only this long.
+FAILURE_SCREENSHOT_TIMEOUT_MS = 5000
+# Playwright's own default locator timeout, restored after every leg (the
+# page has no getter for the current one).
+PAGE_DEFAULT_TIMEOUT_MS = 30000
 
 
-def _run_one_leg_search(
+def _save_failure_debug(page, safe_label: str, error: Exception) -> None:
+    try:
+        DEBUG_WRITER.write(DEBUG_DIR / f"{safe_label}_error.txt", f"{type(error).__name__}: {error}")
+        DEBUG_WRITER.write(
+            DEBUG_DIR / f"{safe_label}_error.png",
+            page.screenshot(full_page=True, timeout=FAILURE_SCREENSHOT_TIMEOUT_MS),
+            compress=False,
+        )
+    except Exception:
+        pass
+
+
+def _fetch_leg(
     page,
     origin: str,
     destination: str,
     leg_date: date,
-    weekend_outbound: date,
-    weekend_inbound: date,
     allow_klm_from_ams: bool = False,
-) -> list[dict]:
-    label = (
-        f"{origin}_{destination}_{leg_date.isoformat()}_"
-        f"{weekend_outbound.isoformat()}_{weekend_inbound.isoformat()}"
-    )
+    timeout_ms: int = LEG_TIMEOUT_MS,
+) -> dict:
+    """
+    Browser half of a leg search: load the page and collect the raw
+    material (XHR bodies, result cards, body text, debug snapshots) as plain
+    data. Nothing is decoded or parsed here; see `_parse_leg`.
+    """
+    label = f"{origin}_{destination}_{leg_date.isoformat()}"
     safe_label = _safe_name(label)
 
     url = _build_google_flights_url(
@@ -383,48 +574,159 @@ def _run_one_leg_search(
 
     print(f"[INFO] Opening {url}")
 
-    response = page.goto(url, wait_until="networkidle", timeout=90000)
+    # Waiting for a rate-limiter token is queueing, not work on this leg, so
+    # it happens before the leg's clock starts.
+    RATE_LIMITER.wait(url)
 
-    page.wait_for_timeout(10000)
-    _maybe_handle_google_interstitials(page)
-    page.wait_for_timeout(3000)
+    # One wall-clock budget for the whole leg: every step gets what is left
+    # of it (as its wait ceiling or as the default locator timeout), and the
+    # leg fails as soon as it is used up. page.evaluate takes no timeout, so
+    # it is only checked after the fact.
+    deadline = time.monotonic() + timeout_ms / 1000
 
-    for _ in range(3):
-        try:
-            page.mouse.wheel(0, 3000)
-        except Exception:
-            pass
-        page.wait_for_timeout(2000)
+    def _left_ms() -> int:
+        left_ms = int((deadline - time.monotonic()) * 1000)
+        if left_ms <= 0:
+            raise PlaywrightTimeoutError(f"{label}: leg timeout of {timeout_ms} ms used up")
+        page.set_default_timeout(left_ms)
+        return left_ms
+
+    try:
+        with ResponseCapture(page) as capture:
+            response = checked_goto(page, url, wait_until="domcontentloaded", timeout=_left_ms())
+
+            _wait_for_stable_results(page, ceiling_ms=min(10000, _left_ms()), label=f"{label} load")
+            # Contexts start from the saved storage state, so the selector probing
+            # only runs when a consent wall or interstitial is actually shown.
+            _left_ms()
+            if consent_wall_detected(page) and _maybe_handle_google_interstitials(page):
+                save_storage_state(page.context)
+                _wait_for_stable_results(page, ceiling_ms=min(3000, _left_ms()), label=f"{label} interstitial")
+
+            _left_ms()
+            bodies = capture.payloads() if EXTRACTION_MODE == "network" else []
+
+        _left_ms()
+        cards = _collect_dom_cards(page) if EXTRACTION_MODE in ("network", "dom") else []
+
+        if not bodies and not cards:
+            # Text fallback: scroll so lazily rendered results end up in the body.
+            for i in range(3):
+                try:
+                    page.mouse.wheel(0, 3000)
+                except Exception:
+                    pass
+                _wait_for_stable_results(
+                    page,
+                    ceiling_ms=min(2000, _left_ms()),
+                    label=f"{label} scroll {i + 1}",
+                    require_results=False,
+                )
+
+        _left_ms()
+        page_text = _collect_page_text(page)
+
+        # Screenshots need the page, so whether to take one is decided here.
+        # Without structured results the text parse (cheap, no browser calls)
+        # decides whether this leg really came back empty.
+        text_rows = None
+        if not bodies and not cards:
+            text_rows = _extract_flight_blocks(page_text, origin=origin, destination=destination)
+
+        snapshot = None
+        if should_capture(safe_label, zero_rows=text_rows == []):
+            snapshot = _snapshot_page(page, timeout_ms=_left_ms())
+
+        return {
+            "origin": origin,
+            "destination": destination,
+            "leg_date": leg_date,
+            "allow_klm_from_ams": allow_klm_from_ams,
+            "label": label,
+            "safe_label": safe_label,
+            "url": url,
+            "status": str(response.status if response else "unknown"),
+            # Page metadata is read once per leg, not once per row.
+            "final_url": page.url,
+            "page_title": page.title(),
+            "network_bodies": bodies,
+            "cards": cards,
+            "page_text": page_text,
+            # Already parsed when there were no structured results.
+            "text_rows": text_rows,
+            "snapshot": snapshot,
+        }
+    finally:
+        # The page outlives this leg (shared sessions, calendar sweeps), so
+        # it must not keep the leftover budget as its default.
+        page.set_default_timeout(PAGE_DEFAULT_TIMEOUT_MS)
+
+
+def _parse_leg(fetched: dict) -> list[dict]:
+    """
+    Parse half of a leg search: decode, filter and build the normalized
+    rows from a `_fetch_leg` result. Plain data in and out, so it can run on
+    any thread (or in another process) while the browser loads the next leg.
+    """
+    origin = fetched["origin"]
+    destination = fetched["destination"]
+    leg_date = fetched["leg_date"]
+    label = fetched["label"]
+
+    parsed_rows: list[dict] = []
+    if fetched["network_bodies"]:
+        parsed_rows = _extract_network_rows(fetched["network_bodies"], origin, destination)
+        source = "network payloads"
+
+    if not parsed_rows and fetched["cards"]:
+        parsed_rows = _extract_dom_rows(fetched["cards"])
+        source = "result cards"
+
+    if not parsed_rows:
+        parsed_rows = fetched.get("text_rows")
+        if parsed_rows is None:
+            parsed_rows = _extract_flight_blocks(fetched["page_text"], origin=origin, destination=destination)
+        source = "body text"
+
+    if parsed_rows:
+        print(f"[INFO] {label}: {len(parsed_rows)} rows from {source}")
 
-    page_text = _collect_page_text(page)
-    parsed_rows = _extract_flight_blocks(page_text, origin=origin, destination=destination)
     filtered_rows = _filter_relevant_flights(
         rows=parsed_rows,
         leg_date=leg_date,
         origin=origin,
         destination=destination,
-        allow_klm_from_ams=allow_klm_from_ams,
+        allow_klm_from_ams=fetched["allow_klm_from_ams"],
     )
 
-    _save_debug(
-        page=page,
-        safe_label=safe_label,
-        url=url,
-        response_status=str(response.status if response else "unknown"),
-        page_text=page_text,
-        parsed_rows=parsed_rows,
-        filtered_rows=filtered_rows,
-    )
+    if should_capture(fetched["safe_label"], zero_rows=not parsed_rows):
+        _save_debug(fetched, parsed_rows=parsed_rows, filtered_rows=filtered_rows)
+
+    # Network and text rows carry no link of their own; borrow the href of
+    # the result card showing the same flight when there is one.
+    card_links = {
+        (row["airline"], parse_clock(row["departure_time"])): row["deep_link"]
+        for row in _extract_dom_rows(fetched["cards"])
+        if row["deep_link"]
+    }
 
     results: list[dict] = []
 
     for row in filtered_rows[:5]:
+        source_url = (
+            row.get("deep_link")
+            or card_links.get((row["airline"], parse_clock(row["departure_time"])))
+            or _build_airline_search_url(
+                origin=origin,
+                destination=destination,
+                leg_date=leg_date.isoformat(),
+                airline=row["airline"],
+            )
+        )
         results.append(
             {
                 "origin": origin,
                 "destination": destination,
-                "outbound": weekend_outbound,
-                "inbound": weekend_inbound,
                 "leg_date": leg_date,
                 "leg_type": "outbound" if destination == "BCN" else "inbound",
                 "airline": row["airline"],
@@ -432,11 +734,11 @@ def _run_one_leg_search(
                 "outbound_arrival": row["arrival_time"],
                 "inbound_departure": "N/A",
                 "inbound_arrival": "N/A",
-                "outbound_flight_no": "N/A",
+                "outbound_flight_no": row.get("flight_no", "N/A"),
                 "inbound_flight_no": "N/A",
                 "price": row["price"],
-                "source_url": page.url,
-                "page_title": page.title(),
+                "source_url": source_url,
+                "page_title": fetched["page_title"],
                 "raw_text": row["raw_block"],
             }
         )
@@ -444,72 +746,360 @@ def _run_one_leg_search(
     return results
 
 
-def search_google_flights(
+def plan_leg_searches(pairs: List[Tuple[date, date]]) -> list[tuple[str, str, date]]:
+    """
+    Unique (origin, destination, leg_date) legs needed by the weekend pairs,
+    in first-seen order. Thu->Sun and Thu->Mon share the Thursday outbound,
+    so every leg is only loaded once per run.
+    """
+    legs: list[tuple[str, str, date]] = []
+    seen: set[tuple[str, str, date]] = set()
+
+    for weekend_outbound, weekend_inbound in pairs:
+        for airport in AIRPORTS:
+            for leg in (
+                (airport, "BCN", weekend_outbound),
+                ("BCN", airport, weekend_inbound),
+            ):
+                if leg in seen:
+                    continue
+                seen.add(leg)
+                legs.append(leg)
+
+    return legs
+
+
+def unfinished_pairs(
     pairs: List[Tuple[date, date]],
+    progress: RunProgress,
     allow_klm_from_ams: bool = False,
+) -> list[tuple[date, date]]:
+    """Pairs with at least one leg left unscraped because the time budget ran out."""
+    return [
+        pair for pair in pairs
+        if any((*leg, allow_klm_from_ams) in progress.out_of_time for leg in plan_leg_searches([pair]))
+    ]
+
+
+def _rows_for_weekend(
+    leg_rows: list[dict],
+    weekend_outbound: date,
+    weekend_inbound: date,
 ) -> list[dict]:
-    DEBUG_DIR.mkdir(parents=True, exist_ok=True)
+    return [
+        {**row, "outbound": weekend_outbound, "inbound": weekend_inbound}
+        for row in leg_rows
+    ]
 
-    results: list[dict] = []
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=True,
-            args=[
-                "--disable-blink-features=AutomationControlled",
-                "--no-sandbox",
-            ],
+def _launch_browser(p):
+    return p.chromium.launch(
+        headless=True,
+        args=[
+            "--disable-blink-features=AutomationControlled",
+            "--no-sandbox",
+        ],
+    )
+
+
+def _new_context(browser):
+    context = browser.new_context(
+        locale="en-GB",
+        timezone_id="Europe/Madrid",
+        user_agent=(
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/122.0.0.0 Safari/537.36"
+        ),
+        viewport={"width": 1440, "height": 2600},
+        **storage_state_kwargs(),
+    )
+    install_resource_blocking(context)
+    return context
+
+
+def _fetch_leg_into_pipeline(
+    page,
+    leg: tuple[str, str, date],
+    allow_klm_from_ams: bool,
+    leg_cache: dict[tuple[str, str, date, bool], list[dict]],
+    pipeline: ParsePipeline,
+    timeout_ms: int = LEG_TIMEOUT_MS,
+) -> bool:
+    origin, destination, leg_date = leg
+    cache_key = (origin, destination, leg_date, allow_klm_from_ams)
+    safe_label = _safe_name(f"{origin}_{destination}_{leg_date.isoformat()}")
+
+    # Failed legs are cached as empty too, so weekend pairs that share them
+    # get no rows rather than a missing key if every retry fails.
+    leg_cache.setdefault(cache_key, [])
+
+    try:
+        fetched = _fetch_leg(
+            page=page,
+            origin=origin,
+            destination=destination,
+            leg_date=leg_date,
+            allow_klm_from_ams=allow_klm_from_ams,
+            timeout_ms=timeout_ms,
         )
+    except PlaywrightTimeoutError as e:
+        print(f"[ERROR] Timeout {origin}->{destination} {leg_date}: {e}")
+        if should_capture(safe_label, failed=True):
+            _save_failure_debug(page, safe_label, e)
+        return False
+    except Exception as e:
+        print(f"[ERROR] {origin}->{destination} {leg_date}: {e}")
+        if should_capture(safe_label, failed=True):
+            _save_failure_debug(page, safe_label, e)
+        return False
+
+    # Parsing happens on the pipeline's workers while this page loads the next leg.
+    pipeline.submit(cache_key, fetched)
+    return True
+
+
+def _drain_legs(
+    page,
+    scheduler: LegScheduler,
+    allow_klm_from_ams: bool,
+    leg_cache: dict[tuple[str, str, date, bool], list[dict]],
+    pipeline: ParsePipeline,
+) -> None:
+    while True:
+        item = scheduler.next_leg()
+        if item is None:
+            break
+
+        leg, attempt = item
+        ok = False
+        try:
+            ok = _fetch_leg_into_pipeline(
+                page,
+                leg,
+                allow_klm_from_ams,
+                leg_cache,
+                pipeline,
+                timeout_ms=scheduler.leg_timeout_ms,
+            )
+        finally:
+            scheduler.report(leg, attempt, ok)
 
-        context = browser.new_context(
-            locale="en-GB",
-            timezone_id="Europe/Madrid",
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/122.0.0.0 Safari/537.36"
-            ),
-            viewport={"width": 1440, "height": 2600},
+
+def _leg_worker(
+    scheduler: LegScheduler,
+    allow_klm_from_ams: bool,
+    leg_cache: dict[tuple[str, str, date, bool], list[dict]],
+    pipeline: ParsePipeline,
+) -> None:
+    """
+    Pull legs from the shared scheduler with an isolated browser.
+
+    The sync Playwright API is bound to the thread that started it, so every
+    worker owns its own playwright driver, browser, context and page.
+    """
+    with BrowserSession() as session:
+        _drain_legs(session.page, scheduler, allow_klm_from_ams, leg_cache, pipeline)
+
+
+class BrowserSession:
+    """
+    A long-lived playwright driver, Chromium browser, context and page.
+
+    Open it once per run and pass it to every `search_google_flights` call so
+    the main scan and the learning sampling share one browser (and its
+    consent cookies) instead of cold-starting Chromium per call. Like the
+    sync Playwright API itself, a session must only be used from the thread
+    that opened it.
+    """
+
+    def __init__(self) -> None:
+        self._playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+
+    def __enter__(self) -> BrowserSession:
+        try:
+            self._playwright = sync_playwright().start()
+            self.browser = _launch_browser(self._playwright)
+            self.context = _new_context(self.browser)
+            self.page = self.context.new_page()
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for resource, method in (
+            (self.context, "close"),
+            (self.browser, "close"),
+            (self._playwright, "stop"),
+        ):
+            if resource is None:
+                continue
+            try:
+                getattr(resource, method)()
+            except Exception:
+                pass
+
+        self._playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+
+
+def _split_completed(
+    legs: list[tuple[str, str, date]],
+    allow_klm_from_ams: bool,
+    progress: RunProgress | None,
+) -> tuple[list[tuple[str, str, date]], dict[tuple[str, str, date, bool], list[dict]]]:
+    """Legs still to scrape, and a leg cache pre-filled with the completed ones."""
+    leg_cache: dict[tuple[str, str, date, bool], list[dict]] = {}
+    if progress is None:
+        return legs, leg_cache
+
+    todo: list[tuple[str, str, date]] = []
+    for leg in legs:
+        rows = progress.completed((*leg, allow_klm_from_ams))
+        if rows is None:
+            todo.append(leg)
+        else:
+            leg_cache[(*leg, allow_klm_from_ams)] = rows
+
+    if leg_cache:
+        print(f"[INFO] Skipping {len(leg_cache)} legs completed earlier in this run")
+
+    return todo, leg_cache
+
+
+def search_legs(
+    legs: list[tuple[str, str, date]],
+    allow_klm_from_ams: bool = False,
+    concurrency: int = 1,
+    session: BrowserSession | None = None,
+    progress: RunProgress | None = None,
+) -> dict[tuple[str, str, date, bool], list[dict]]:
+    """
+    Scrape the given (origin, destination, leg_date) legs and return the
+    leg cache: (origin, destination, leg_date, allow_klm_from_ams) -> rows.
+
+    With concurrency > 1, legs are spread over that many parallel browser
+    sessions. An injected `session` is driven from the calling thread and
+    counts as one of them. Failed legs are retried by the `LegScheduler`.
+    With `progress`, legs already completed are not scraped again and each
+    newly parsed leg is checkpointed immediately.
+    """
+    DEBUG_DIR.mkdir(parents=True, exist_ok=True)
+
+    # (origin, destination, leg_date, allow_klm_from_ams) -> parsed leg rows
+    legs, leg_cache = _split_completed(legs, allow_klm_from_ams, progress)
+    if not legs:
+        return leg_cache
+
+    if progress is not None and progress.expired():
+        print(f"[INFO] Time budget used up; not starting {len(legs)} legs")
+        progress.record_skipped([(*leg, allow_klm_from_ams) for leg in legs], "time_budget")
+        return leg_cache
+
+    def _store(cache_key, rows) -> None:
+        leg_cache[cache_key] = rows
+        if progress is not None:
+            progress.record(cache_key, rows)
+
+    def _parse_failed(cache_key, error) -> None:
+        # Not checkpointed, so --resume scrapes the leg again.
+        if progress is not None:
+            progress.record_skipped([cache_key], "parse_failed")
+
+    scheduler = LegScheduler(legs, deadline=progress.deadline if progress is not None else None)
+
+    workers = max(1, min(concurrency, len(legs)))
+    thread_workers = workers - 1 if session is not None else workers
+
+    if workers > 1:
+        print(f"[INFO] Scraping {len(legs)} legs with {workers} parallel browsers")
+
+    with ParsePipeline(parse=_parse_leg, sink=_store, on_error=_parse_failed) as pipeline:
+        if thread_workers == 0:
+            _drain_legs(session.page, scheduler, allow_klm_from_ams, leg_cache, pipeline)
+        elif thread_workers == 1 and session is None:
+            _leg_worker(scheduler, allow_klm_from_ams, leg_cache, pipeline)
+        else:
+            with ThreadPoolExecutor(max_workers=thread_workers) as executor:
+                futures = [
+                    executor.submit(_leg_worker, scheduler, allow_klm_from_ams, leg_cache, pipeline)
+                    for _ in range(thread_workers)
+                ]
+
+                if session is not None:
+                    _drain_legs(session.page, scheduler, allow_klm_from_ams, leg_cache, pipeline)
+
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"[ERROR] Browser worker crashed: {e}")
+
+    DEBUG_WRITER.flush()
+
+    if scheduler.failed or scheduler.skipped:
+        print(
+            f"[ERROR] {len(scheduler.failed)} legs failed after retries, "
+            f"{len(scheduler.skipped)} skipped by the circuit breaker"
         )
 
-        page = context.new_page()
+    if progress is not None:
+        for reason, skipped in (
+            ("failed", scheduler.failed),
+            ("circuit_breaker", scheduler.skipped),
+            ("time_budget", scheduler.out_of_time),
+        ):
+            progress.record_skipped([(*leg, allow_klm_from_ams) for leg in skipped], reason)
 
-        for weekend_outbound, weekend_inbound in pairs:
-            for airport in ["AMS", "RTM"]:
-                try:
-                    outbound_rows = _run_one_leg_search(
-                        page=page,
-                        origin=airport,
-                        destination="BCN",
-                        leg_date=weekend_outbound,
-                        weekend_outbound=weekend_outbound,
-                        weekend_inbound=weekend_inbound,
-                        allow_klm_from_ams=allow_klm_from_ams,
-                    )
-                    results.extend(outbound_rows)
-                except PlaywrightTimeoutError as e:
-                    print(f"[ERROR] Timeout outbound {airport}->BCN {weekend_outbound}: {e}")
-                except Exception as e:
-                    print(f"[ERROR] Outbound {airport}->BCN {weekend_outbound}: {e}")
+    return leg_cache
 
-                try:
-                    inbound_rows = _run_one_leg_search(
-                        page=page,
-                        origin="BCN",
-                        destination=airport,
-                        leg_date=weekend_inbound,
-                        weekend_outbound=weekend_outbound,
-                        weekend_inbound=weekend_inbound,
-                        allow_klm_from_ams=allow_klm_from_ams,
-                    )
-                    results.extend(inbound_rows)
-                except PlaywrightTimeoutError as e:
-                    print(f"[ERROR] Timeout inbound BCN->{airport} {weekend_inbound}: {e}")
-                except Exception as e:
-                    print(f"[ERROR] Inbound BCN->{airport} {weekend_inbound}: {e}")
-
-        context.close()
-        browser.close()
+
+def search_google_flights(
+    pairs: List[Tuple[date, date]],
+    allow_klm_from_ams: bool = False,
+    concurrency: int = 1,
+    session: BrowserSession | None = None,
+    progress: RunProgress | None = None,
+) -> list[dict]:
+    """
+    Scrape every unique leg needed by `pairs` and return one row per
+    (weekend pair, flight option). The final sort makes the output
+    independent of scrape order.
+    """
+    leg_cache = search_legs(
+        plan_leg_searches(pairs),
+        allow_klm_from_ams=allow_klm_from_ams,
+        concurrency=concurrency,
+        session=session,
+        progress=progress,
+    )
+    return assemble_weekend_rows(pairs, leg_cache, allow_klm_from_ams)
+
+
+def assemble_weekend_rows(
+    pairs: List[Tuple[date, date]],
+    leg_cache: dict[tuple[str, str, date, bool], list[dict]],
+    allow_klm_from_ams: bool,
+) -> list[dict]:
+    results: list[dict] = []
+
+    for weekend_outbound, weekend_inbound in pairs:
+        for airport in AIRPORTS:
+            for origin, destination, leg_date in (
+                (airport, "BCN", weekend_outbound),
+                ("BCN", airport, weekend_inbound),
+            ):
+                leg_rows = leg_cache.get((origin, destination, leg_date, allow_klm_from_ams), [])
+                results.extend(_rows_for_weekend(leg_rows, weekend_outbound, weekend_inbound))
 
     results.sort(
         key=lambda r: (
@@ -524,3 +1114,300 @@ def search_google_flights(
     )
 
     return results
+
+
+def _shard_worker(
+    shard_index: int,
+    legs: list[tuple[str, str, date]],
+    allow_klm_from_ams: bool,
+    result_queue,
+    time_left_s: float | None = None,
+    shard_count: int = 1,
+) -> None:
+    """
+    Entry point of a shard process: one browser, legs scraped in order and
+    each leg's rows streamed back to the parent as soon as it is done.
+    """
+    # Own process group, so the parent can stop the Playwright driver and
+    # Chromium together with this process.
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    # SIGTERM unwinds through BrowserSession.close() instead of orphaning
+    # the browser.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    # Every shard hits the same domains, so each gets its share of the rate.
+    RATE_LIMITER.split(shard_count)
+
+    leg_cache: dict[tuple[str, str, date, bool], list[dict]] = {}
+
+    def _stream(cache_key, rows) -> None:
+        leg_cache[cache_key] = rows
+        result_queue.put((shard_index, cache_key[:3], rows))
+
+    # Deadlines are passed as seconds left; monotonic clocks are per process.
+    deadline = time.monotonic() + time_left_s if time_left_s is not None else None
+
+    try:
+        scheduler = LegScheduler(legs, deadline=deadline)
+        with ParsePipeline(parse=_parse_leg, sink=_stream) as pipeline:
+            with BrowserSession() as session:
+                _drain_legs(session.page, scheduler, allow_klm_from_ams, leg_cache, pipeline)
+        DEBUG_WRITER.flush()
+    finally:
+        result_queue.put((shard_index, None, None))
+
+
+# How long a shard gets to close its browser after SIGTERM before its whole
+# process group is killed.
+SHARD_STOP_GRACE_S = 10
+
+
+def _stop_shard(process) -> None:
+    """SIGTERM the shard, then SIGKILL whatever is left of its process group."""
+    if not hasattr(os, "killpg"):
+        process.terminate()
+        process.join(timeout=SHARD_STOP_GRACE_S)
+        return
+
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        # Killed before it got to setpgrp(); it has no group of its own yet.
+        process.terminate()
+    process.join(timeout=SHARD_STOP_GRACE_S)
+
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def search_google_flights_sharded(
+    pairs: List[Tuple[date, date]],
+    shards: int,
+    allow_klm_from_ams: bool = False,
+    shard_timeout_s: float | None = None,
+    progress: RunProgress | None = None,
+) -> list[dict]:
+    """
+    Same result as `search_google_flights`, but the unique legs are dealt
+    round-robin to `shards` worker processes, each with its own Chromium.
+
+    A shard that crashes or exceeds `shard_timeout_s` only loses its
+    remaining legs; whatever it streamed back before that is kept (and
+    checkpointed in `progress` as it arrives). With a time budget, shards
+    still running one leg timeout past the deadline are terminated too.
+    """
+    DEBUG_DIR.mkdir(parents=True, exist_ok=True)
+
+    legs, leg_cache = _split_completed(plan_leg_searches(pairs), allow_klm_from_ams, progress)
+    if not legs:
+        return assemble_weekend_rows(pairs, leg_cache, allow_klm_from_ams)
+
+    time_left_s = progress.time_left() if progress is not None else None
+    if time_left_s is not None:
+        # The last leg started before the deadline gets its own timeout.
+        budget_timeout_s = time_left_s + LEG_TIMEOUT_MS / 1000
+        shard_timeout_s = budget_timeout_s if shard_timeout_s is None else min(shard_timeout_s, budget_timeout_s)
+
+    shards = max(1, min(shards, len(legs)))
+    shard_legs = [legs[i::shards] for i in range(shards)]
+
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    processes = [
+        ctx.Process(
+            target=_shard_worker,
+            args=(i, shard_legs[i], allow_klm_from_ams, result_queue, time_left_s, shards),
+            name=f"gf-shard-{i}",
+        )
+        for i in range(shards)
+    ]
+
+    print(f"[INFO] Scraping {len(legs)} legs in {shards} shard processes")
+    started = time.monotonic()
+    for process in processes:
+        process.start()
+
+    running = set(range(shards))
+
+    def _take(message) -> None:
+        shard_index, leg, leg_rows = message
+        if leg is None:
+            running.discard(shard_index)
+            return
+
+        leg_cache[(*leg, allow_klm_from_ams)] = leg_rows
+        if progress is not None:
+            progress.record((*leg, allow_klm_from_ams), leg_rows)
+
+    while running:
+        # Checked on every message, so shards that keep streaming do not
+        # hide one that hangs.
+        if shard_timeout_s is not None and time.monotonic() - started > shard_timeout_s:
+            for i in sorted(running):
+                print(f"[ERROR] Shard {i} timed out after {shard_timeout_s:.0f} s")
+                _stop_shard(processes[i])
+            running.clear()
+
+            # Legs streamed before the timeout may still be in the queue.
+            while True:
+                try:
+                    _take(result_queue.get(timeout=1))
+                except queue.Empty:
+                    break
+            break
+
+        try:
+            message = result_queue.get(timeout=5)
+        except queue.Empty:
+            for i in list(running):
+                if not processes[i].is_alive():
+                    print(f"[ERROR] Shard {i} exited with code {processes[i].exitcode}")
+                    running.discard(i)
+            continue
+
+        _take(message)
+
+    for process in processes:
+        process.join(timeout=30)
+
+    if progress is not None:
+        # Shards do not report why a leg is missing; past the deadline it is
+        # almost always the time budget.
+        missing = [(*leg, allow_klm_from_ams) for leg in legs if (*leg, allow_klm_from_ams) not in leg_cache]
+        progress.record_skipped(missing, "time_budget" if progress.expired() else "failed")
+
+    return assemble_weekend_rows(pairs, leg_cache, allow_klm_from_ams)
+
+
+DATE_PICKER_SELECTORS = [
+    "input[aria-label='Departure']",
+    "input[placeholder='Departure']",
+    "[aria-label^='Departure']",
+]
+
+NEXT_MONTH_SELECTORS = [
+    "button[aria-label='Next']",
+    "[role='dialog'] button[aria-label*='Next']",
+]
+
+MAX_CALENDAR_PAGES = 6
+
+# Date grid cells carry the ISO date in data-iso and the lowest fare as text.
+_CALENDAR_CELLS_JS = """
+() => Array.from(document.querySelectorAll("[data-iso]")).map((el) => ({
+  iso: el.getAttribute("data-iso"),
+  text: el.innerText || "",
+}))
+"""
+
+
+def _read_calendar_cells(page) -> dict[date, float]:
+    try:
+        cells = page.evaluate(_CALENDAR_CELLS_JS)
+    except Exception:
+        return {}
+
+    prices: dict[date, float] = {}
+    for cell in cells or []:
+        try:
+            day = date.fromisoformat(cell["iso"])
+        except (KeyError, TypeError, ValueError):
+            continue
+
+        price = _extract_price_from_line(_normalize_text(cell.get("text") or ""))
+        if price is not None:
+            prices[day] = price
+
+    return prices
+
+
+def _merge_min_prices(target: dict[date, float], source: dict[date, float]) -> None:
+    for day, price in source.items():
+        if day not in target or price < target[day]:
+            target[day] = price
+
+
+def _sweep_one_calendar(
+    page,
+    origin: str,
+    destination: str,
+    start_date: date,
+    end_date: date,
+) -> dict[date, float]:
+    """
+    Lowest nonstop fare per departure date between start_date and end_date,
+    harvested from the date grid of a single search page (paging forward
+    through months as needed).
+    """
+    label = f"calendar_{origin}_{destination}_{start_date.isoformat()}"
+    url = _build_google_flights_url(origin, destination, start_date.isoformat()) + "%20nonstop"
+
+    print(f"[INFO] Calendar sweep {origin}->{destination} {start_date} .. {end_date}")
+
+    prices: dict[date, float] = {}
+
+    with ResponseCapture(page, markers=CALENDAR_MARKERS) as capture:
+        throttled_goto(page, url, wait_until="domcontentloaded", timeout=LEG_TIMEOUT_MS)
+        _wait_for_stable_results(page, ceiling_ms=10000, label=f"{label} load")
+
+        if consent_wall_detected(page) and _maybe_handle_google_interstitials(page):
+            save_storage_state(page.context)
+            _wait_for_stable_results(page, ceiling_ms=3000, label=f"{label} interstitial")
+
+        if not _click_if_present(page, DATE_PICKER_SELECTORS, timeout=3000):
+            print(f"[ERROR] {label}: date picker not found")
+            return {}
+
+        _wait_for_stable_results(page, ceiling_ms=5000, label=f"{label} picker", require_results=False)
+
+        for _ in range(MAX_CALENDAR_PAGES):
+            _merge_min_prices(prices, _read_calendar_cells(page))
+            if prices and max(prices) >= end_date:
+                break
+            if not _click_if_present(page, NEXT_MONTH_SELECTORS, timeout=2000):
+                break
+            _wait_for_stable_results(page, ceiling_ms=3000, label=f"{label} next", require_results=False)
+
+        _merge_min_prices(prices, extract_calendar_prices(capture.payloads()))
+
+    try:
+        page.keyboard.press("Escape")
+    except Exception:
+        pass
+
+    return {day: price for day, price in prices.items() if start_date <= day <= end_date}
+
+
+def search_calendar_prices(
+    routes: list[tuple[str, str]],
+    start_date: date,
+    end_date: date,
+    session: BrowserSession | None = None,
+) -> dict[tuple[str, str], dict[date, float]]:
+    """
+    Calendar sweep mode: one page load per route (plus month paging) returns
+    the lowest price for every departure date in the range, instead of one
+    page load per (route, date).
+    """
+    results: dict[tuple[str, str], dict[date, float]] = {}
+
+    def _sweep_all(page) -> None:
+        for origin, destination in routes:
+            try:
+                results[(origin, destination)] = _sweep_one_calendar(
+                    page, origin, destination, start_date, end_date
+                )
+            except Exception as e:
+                print(f"[ERROR] Calendar sweep {origin}->{destination}: {e}")
+                results[(origin, destination)] = {}
+
+    if session is not None:
+        _sweep_all(session.page)
+    else:
+        with BrowserSession() as own_session:
+            _sweep_all(own_session.page)
+
+    return results
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import threading
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+from src.models import LegRequest
+from src.scrapers.flight_rules import flight_ok, format_clock
+from src.scrapers.rate_limiter import RATE_LIMITER
+
+
+# Tequila (Kiwi.com) search API. Point KIWI_API_URL at a local stub server
+# to exercise the provider without network access or an API key.
+KIWI_API_URL = os.environ.get("KIWI_API_URL", "https://api.tequila.kiwi.com")
+KIWI_API_KEY = os.environ.get("KIWI_API_KEY", "")
+
+# Itineraries per batched search. Tequila sorts by price, so a full page
+# means the more expensive wanted flights may have been cut off.
+KIWI_RESULT_LIMIT = 1000
+
+AIRLINE_NAMES = {
+    "VY": "Vueling",
+    "HV": "Transavia",
+    "TO": "Transavia",
+    "KL": "KLM",
+}
+
+
+class HTTPPool:
+    """
+    Keep-alive HTTP(S) connections reused across requests, one per host and
+    thread (http.client connections are not thread-safe).
+    """
+
+    def __init__(self, timeout: float = 30.0) -> None:
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        conns = self._local.__dict__.setdefault("conns", {})
+        key = (scheme, netloc)
+
+        if key not in conns:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conns[key] = cls(netloc, timeout=self.timeout)
+
+        return conns[key]
+
+    def _drop(self, scheme: str, netloc: str) -> None:
+        conn = self._local.__dict__.get("conns", {}).pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def get_json(self, url: str, params: dict, headers: dict | None = None) -> dict:
+        parts = urlsplit(url)
+        path = f"{parts.path}?{urlencode(params)}"
+
+        # A kept-alive connection may have been closed by the server; retry
+        # once on a fresh one before giving up.
+        for attempt in range(2):
+            RATE_LIMITER.wait(url)
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request("GET", path, headers={"Accept": "application/json", **(headers or {})})
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                self._drop(parts.scheme, parts.netloc)
+                if attempt == 1:
+                    raise
+                continue
+
+            RATE_LIMITER.report(url, blocked=response.status == 429)
+
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status} from {parts.netloc}: {body[:200]!r}")
+
+            return json.loads(body)
+
+        return {}
+
+    def close(self) -> None:
+        for conn in self._local.__dict__.get("conns", {}).values():
+            conn.close()
+        self._local.__dict__["conns"] = {}
+
+
+HTTP_POOL = HTTPPool()
+
+
+def _group_legs(legs: list[LegRequest]) -> dict[tuple, list[LegRequest]]:
+    """
+    Batch legs into one API call per (direction, allow_klm_from_ams):
+    outbound legs share fly_to=BCN and inbound legs fly_from=BCN, so each
+    batch is a set of airports plus a date range.
+    """
+    groups: dict[tuple, list[LegRequest]] = {}
+    for leg in legs:
+        groups.setdefault((leg.leg_type, leg.allow_klm_from_ams), []).append(leg)
+    return groups
+
+
+def _batch_params(batch: list[LegRequest], allow_klm: bool) -> dict:
+    origins = sorted({leg.origin for leg in batch})
+    destinations = sorted({leg.destination for leg in batch})
+    date_from = min(leg.leg_date for leg in batch)
+    date_to = max(leg.leg_date for leg in batch)
+
+    airlines = ["VY", "HV", "TO"] + (["KL"] if allow_klm else [])
+
+    # Only the weekdays the legs fly on (Tequila counts 0 = Sunday), so the
+    # Tue/Wed/Sat flights in the date range do not fill up the result limit.
+    fly_days = sorted({(leg.leg_date.weekday() + 1) % 7 for leg in batch})
+
+    return {
+        "fly_from": ",".join(origins),
+        "fly_to": ",".join(destinations),
+        "date_from": date_from.strftime("%d/%m/%Y"),
+        "date_to": date_to.strftime("%d/%m/%Y"),
+        "flight_type": "oneway",
+        "max_stopovers": 0,
+        "select_airlines": ",".join(airlines),
+        "fly_days": ",".join(str(day) for day in fly_days),
+        "fly_days_type": "departure",
+        "curr": "EUR",
+        "limit": KIWI_RESULT_LIMIT,
+    }
+
+
+def _itinerary_to_row(item: dict, leg: LegRequest) -> dict | None:
+    route = item.get("route") or []
+    if len(route) != 1:
+        return None
+
+    segment = route[0]
+    code = segment.get("airline") or (item.get("airlines") or [None])[0]
+    airline = AIRLINE_NAMES.get(code)
+    if airline is None:
+        return None
+
+    try:
+        dep = datetime.fromisoformat(item["local_departure"].replace("Z", ""))
+        arr = datetime.fromisoformat(item["local_arrival"].replace("Z", ""))
+        price = float(item["price"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    if not flight_ok(
+        leg.origin,
+        leg.destination,
+        leg.leg_date,
+        airline,
+        format_clock(dep),
+        price,
+        leg.allow_klm_from_ams,
+    ):
+        return None
+
+    flight_no = f"{code}{segment['flight_no']}" if segment.get("flight_no") else "N/A"
+
+    return {
+        "origin": leg.origin,
+        "destination": leg.destination,
+        "leg_date": leg.leg_date,
+        "leg_type": leg.leg_type,
+        "airline": airline,
+        "outbound_departure": format_clock(dep),
+        "outbound_arrival": format_clock(arr),
+        "inbound_departure": "N/A",
+        "inbound_arrival": "N/A",
+        "outbound_flight_no": flight_no,
+        "inbound_flight_no": "N/A",
+        "price": price,
+        "source_url": item.get("deep_link") or "",
+        "page_title": "Kiwi.com",
+        "raw_text": json.dumps(item)[:2000],
+    }
+
+
+def search_kiwi_legs(
+    legs: list[LegRequest],
+    base_url: str | None = None,
+    api_key: str | None = None,
+    pool: HTTPPool | None = None,
+) -> dict[LegRequest, list[dict]]:
+    """
+    Answer every leg with one batched search per direction (all origins and
+    the whole date range in a single request), in the same row shape as the
+    Google Flights scraper.
+    """
+    base_url = KIWI_API_URL if base_url is None else base_url
+    api_key = KIWI_API_KEY if api_key is None else api_key
+    pool = HTTP_POOL if pool is None else pool
+
+    results: dict[LegRequest, list[dict]] = {leg: [] for leg in legs}
+
+    for (_, allow_klm), batch in _group_legs(legs).items():
+        wanted = {(leg.origin, leg.destination, leg.leg_date): leg for leg in batch}
+        params = _batch_params(batch, allow_klm)
+
+        try:
+            payload = pool.get_json(f"{base_url.rstrip('/')}/v2/search", params, headers={"apikey": api_key})
+        except Exception as e:
+            print(f"[ERROR] Kiwi search {params['fly_from']}->{params['fly_to']}: {e}")
+            continue
+
+        if len(payload.get("data", [])) >= params["limit"]:
+            print(
+                f"[ERROR] Kiwi {params['fly_from']}->{params['fly_to']}: hit the limit of "
+                f"{params['limit']} itineraries, some wanted flights may be missing"
+            )
+
+        for item in payload.get("data", []):
+            try:
+                day = datetime.fromisoformat(item["local_departure"].replace("Z", "")).date()
+                leg = wanted.get((item["flyFrom"], item["flyTo"], day))
+            except (KeyError, TypeError, ValueError):
+                continue
+
+            if leg is None:
+                continue
+
+            row = _itinerary_to_row(item, leg)
+            if row is not None:
+                results[leg].append(row)
+
+        print(
+            f"[INFO] Kiwi {params['fly_from']}->{params['fly_to']} "
+            f"{params['date_from']}..{params['date_to']}: {len(payload.get('data', []))} itineraries"
+        )
+
+    for leg, rows in results.items():
+        rows.sort(key=lambda r: (r["price"], r["outbound_departure"]))
+        results[leg] = rows[:5]
+
+    return results
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from typing import Any, Callable
+
+
+# Parse workers behind the browsers, and how many fetched pages may wait for
+# them before the browsers block. PARSE_WORKERS=0 parses inline.
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", "2"))
+PIPELINE_DEPTH = int(os.environ.get("PIPELINE_DEPTH", "4"))
+
+_STOP = object()
+
+
+class ParsePipeline:
+    """
+    Bounded producer/consumer queue between browser threads and parse
+    workers.
+
+    Browsers `submit(key, payload)` and move on to the next page; workers run
+    `parse(payload)` and hand the rows to `sink(key, rows)`. `submit` blocks
+    once `depth` payloads are waiting, so a slow parser throttles the
+    browsers instead of piling up raw pages in memory. `parse` only receives
+    plain data, which keeps the door open to a process pool later.
+
+    A payload whose parse raises never reaches `sink`, so a parser bug is not
+    stored as a leg without flights; it goes to `on_error(key, exc)` instead.
+    """
+
+    def __init__(
+        self,
+        parse: Callable[[Any], list[dict]],
+        sink: Callable[[Any, list[dict]], None],
+        on_error: Callable[[Any, Exception], None] | None = None,
+        workers: int = PARSE_WORKERS,
+        depth: int = PIPELINE_DEPTH,
+    ) -> None:
+        self._parse = parse
+        self._sink = sink
+        self._on_error = on_error
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, depth))
+        self._threads = [
+            threading.Thread(target=self._work, name=f"leg-parser-{i}", daemon=True)
+            for i in range(max(0, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _handle(self, key, payload) -> None:
+        try:
+            rows = self._parse(payload)
+        except Exception as e:
+            print(f"[ERROR] Parsing {key}: {e}")
+            if self._on_error is not None:
+                try:
+                    self._on_error(key, e)
+                except Exception as record_error:
+                    print(f"[ERROR] Recording parse failure of {key}: {record_error}")
+            return
+
+        try:
+            self._sink(key, rows)
+        except Exception as e:
+            print(f"[ERROR] Storing {key}: {e}")
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            self._handle(*item)
+
+    def submit(self, key, payload) -> None:
+        if not self._threads:
+            self._handle(key, payload)
+            return
+        self._queue.put((key, payload))
+
+    def close(self) -> None:
+        """Wait until every submitted payload has been parsed and stored."""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self) -> ParsePipeline:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
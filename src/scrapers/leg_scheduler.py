@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from datetime import date
+
+
+Leg = tuple[str, str, date]
+
+MAX_ATTEMPTS = 3
+BACKOFF_BASE_S = 15.0
+BACKOFF_MAX_S = 240.0
+LEG_TIMEOUT_MS = 60000
+
+# Circuit breaker: after BREAKER_THRESHOLD consecutive failures the site is
+# assumed to be blocking us. Scheduling pauses for BREAKER_COOLDOWN_S, then a
+# single probe leg runs; if that fails too, the remaining legs are skipped.
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN_S = 120.0
+
+
+class LegScheduler:
+    """
+    Thread-safe work queue of legs shared by the browser workers.
+
+    Failed legs go to the back of the queue with exponential backoff instead
+    of being dropped, so one slow or flaky leg does not hold up the others.
+    """
+
+    def __init__(
+        self,
+        legs: list[Leg],
+        max_attempts: int = MAX_ATTEMPTS,
+        backoff_base_s: float = BACKOFF_BASE_S,
+        backoff_max_s: float = BACKOFF_MAX_S,
+        leg_timeout_ms: int = LEG_TIMEOUT_MS,
+        breaker_threshold: int = BREAKER_THRESHOLD,
+        breaker_cooldown_s: float = BREAKER_COOLDOWN_S,
+        deadline: float | None = None,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.leg_timeout_ms = leg_timeout_ms
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown_s = breaker_cooldown_s
+        # time.monotonic() after which no new leg is started.
+        self.deadline = deadline
+
+        # (leg, attempt, not_before monotonic time)
+        self._pending: deque[tuple[Leg, int, float]] = deque((leg, 1, 0.0) for leg in legs)
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._consecutive_failures = 0
+        self._breaker_state = "closed"
+        self._breaker_open_until = 0.0
+
+        self.aborted = False
+        self.failed: list[Leg] = []
+        self.skipped: list[Leg] = []
+        self.out_of_time: list[Leg] = []
+
+    def _wait(self, timeout: float) -> None:
+        if self.deadline is not None:
+            timeout = min(timeout, max(self.deadline - time.monotonic(), 0.05))
+        self._cond.wait(timeout=timeout)
+
+    def next_leg(self) -> tuple[Leg, int] | None:
+        """
+        Block until a leg is ready to run and return (leg, attempt), or None
+        once there is nothing left to do (or the breaker gave up, or the
+        deadline passed).
+        """
+        with self._cond:
+            while True:
+                if self.aborted:
+                    return None
+
+                now = time.monotonic()
+
+                if self.deadline is not None and now >= self.deadline and self._pending:
+                    # In-flight legs finish; nothing new is started.
+                    self.out_of_time.extend(leg for leg, _, _ in self._pending)
+                    self._pending.clear()
+                    print(f"[INFO] Time budget used up; leaving {len(self.out_of_time)} legs unscraped")
+
+                if not self._pending:
+                    if self._in_flight == 0:
+                        return None
+                    # An in-flight leg may still fail and be requeued.
+                    self._wait(1.0)
+                    continue
+
+                if self._breaker_state == "open":
+                    if now < self._breaker_open_until:
+                        self._wait(self._breaker_open_until - now)
+                        continue
+                    # Legs started before the breaker opened (possibly slowed
+                    # by the rate limiter) must report first, or their result
+                    # would be taken for the probe's.
+                    if self._in_flight > 0:
+                        self._wait(1.0)
+                        continue
+                    self._breaker_state = "half_open"
+                    print("[INFO] Circuit breaker half-open, probing with one leg")
+
+                if self._breaker_state == "half_open" and self._in_flight > 0:
+                    self._wait(1.0)
+                    continue
+
+                ready_index = next(
+                    (i for i, (_, _, not_before) in enumerate(self._pending) if not_before <= now),
+                    None,
+                )
+                if ready_index is None:
+                    earliest = min(not_before for _, _, not_before in self._pending)
+                    self._wait(max(earliest - now, 0.05))
+                    continue
+
+                leg, attempt, _ = self._pending[ready_index]
+                del self._pending[ready_index]
+                self._in_flight += 1
+                return leg, attempt
+
+    def report(self, leg: Leg, attempt: int, ok: bool) -> None:
+        with self._cond:
+            self._in_flight -= 1
+
+            if ok:
+                self._consecutive_failures = 0
+                if self._breaker_state == "half_open":
+                    print("[INFO] Circuit breaker closed, probe leg succeeded")
+                self._breaker_state = "closed"
+                self._cond.notify_all()
+                return
+
+            self._consecutive_failures += 1
+
+            if attempt < self.max_attempts:
+                delay = min(self.backoff_base_s * 2 ** (attempt - 1), self.backoff_max_s)
+                delay *= random.uniform(0.8, 1.2)
+                self._pending.append((leg, attempt + 1, time.monotonic() + delay))
+                print(f"[INFO] Retrying {leg[0]}->{leg[1]} {leg[2]} in {delay:.0f} s (attempt {attempt + 1})")
+            else:
+                self.failed.append(leg)
+                print(f"[ERROR] Giving up on {leg[0]}->{leg[1]} {leg[2]} after {attempt} attempts")
+
+            if self._breaker_state == "half_open":
+                self._abort("probe leg failed while circuit breaker was half-open")
+            elif self._consecutive_failures >= self.breaker_threshold and self._breaker_state == "closed":
+                self._breaker_state = "open"
+                self._breaker_open_until = time.monotonic() + self.breaker_cooldown_s
+                print(
+                    f"[ERROR] Circuit breaker open after {self._consecutive_failures} consecutive "
+                    f"failures, pausing {self.breaker_cooldown_s:.0f} s"
+                )
+
+            self._cond.notify_all()
+
+    def _abort(self, reason: str) -> None:
+        self.aborted = True
+        self.skipped.extend(leg for leg, _, _ in self._pending)
+        self._pending.clear()
+        print(f"[ERROR] Stopping scrape ({reason}); skipped {len(self.skipped)} legs")
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+from typing import List, Protocol, Tuple
+
+from src.models import LegRequest
+from src.run_progress import RunProgress
+from src.scrapers.flight_rules import format_clock, parse_clock
+from src.scrapers.google_flights_ui import (
+    BrowserSession,
+    assemble_weekend_rows,
+    plan_leg_searches,
+    search_legs,
+)
+from src.scrapers.kiwi_api import search_kiwi_legs
+from src.scrapers.skyscanner import scrape_skyscanner_legs
+
+
+class FlightProvider(Protocol):
+    """
+    A flight source that answers one-way leg requests with normalized rows
+    (the dict shape of `google_flights_ui._parse_leg`).
+
+    `thread_bound` providers hold a sync Playwright session that must be
+    driven from the calling thread; the others may run in worker threads.
+    """
+
+    name: str
+    thread_bound: bool
+
+    def search_legs(self, legs: list[LegRequest]) -> dict[LegRequest, list[dict]]:
+        ...
+
+
+class GoogleFlightsProvider:
+    name = "google_flights"
+
+    def __init__(self, concurrency: int = 1, session: BrowserSession | None = None) -> None:
+        self.concurrency = concurrency
+        self.session = session
+        self.thread_bound = session is not None
+
+    def search_legs(self, legs: list[LegRequest]) -> dict[LegRequest, list[dict]]:
+        results: dict[LegRequest, list[dict]] = {}
+
+        # search_legs takes one allow_klm_from_ams flag per call.
+        for allow_klm in sorted({leg.allow_klm_from_ams for leg in legs}):
+            batch = [leg for leg in legs if leg.allow_klm_from_ams == allow_klm]
+            leg_cache = search_legs(
+                [(leg.origin, leg.destination, leg.leg_date) for leg in batch],
+                allow_klm_from_ams=allow_klm,
+                concurrency=self.concurrency,
+                session=self.session,
+            )
+            for leg in batch:
+                results[leg] = leg_cache.get(
+                    (leg.origin, leg.destination, leg.leg_date, allow_klm), []
+                )
+
+        return results
+
+
+class SkyscannerProvider:
+    name = "skyscanner"
+    thread_bound = False
+
+    def search_legs(self, legs: list[LegRequest]) -> dict[LegRequest, list[dict]]:
+        return scrape_skyscanner_legs(legs)
+
+
+class KiwiProvider:
+    name = "kiwi"
+    thread_bound = False
+
+    def search_legs(self, legs: list[LegRequest]) -> dict[LegRequest, list[dict]]:
+        return search_kiwi_legs(legs)
+
+
+PROVIDERS = {
+    "google_flights": GoogleFlightsProvider,
+    "skyscanner": SkyscannerProvider,
+    "kiwi": KiwiProvider,
+}
+
+
+def _normalize_clocks(row: dict) -> dict:
+    """Departures and arrivals in the one format every provider's rows share."""
+    for field in ("outbound_departure", "outbound_arrival", "inbound_departure", "inbound_arrival"):
+        value = row.get(field) or ""
+        parsed = parse_clock(value)
+        if parsed is not None:
+            # An arrival past midnight keeps its "+1".
+            row[field] = format_clock(parsed) + ("+1" if value.rstrip().endswith("+1") else "")
+    return row
+
+
+def _merge_provider_rows(rows_by_provider: dict[str, list[dict]], limit: int = 5) -> list[dict]:
+    """
+    One row per flight (airline + departure time), keeping the cheapest
+    provider's row. `providers` lists every source that saw the flight.
+    """
+    best: dict[tuple[str, str], dict] = {}
+
+    for provider_name, rows in rows_by_provider.items():
+        for row in rows:
+            key = (row["airline"].lower(), parse_clock(row["outbound_departure"]))
+            seen_by = best[key]["providers"] if key in best else []
+
+            if key not in best or row["price"] < best[key]["price"]:
+                best[key] = _normalize_clocks({**row, "provider": provider_name})
+
+            best[key]["providers"] = sorted({*seen_by, provider_name})
+
+    merged = sorted(
+        best.values(),
+        key=lambda r: (r["price"], parse_clock(r["outbound_departure"]) or time.max),
+    )
+    return merged[:limit]
+
+
+def fan_out_leg_search(
+    providers: list[FlightProvider],
+    legs: list[LegRequest],
+) -> dict[LegRequest, list[dict]]:
+    """
+    Query every provider for the same legs concurrently and merge the
+    answers, keeping the best price per flight.
+    """
+    rows_by_provider: dict[str, dict[LegRequest, list[dict]]] = {}
+
+    def _run(provider: FlightProvider) -> None:
+        try:
+            rows_by_provider[provider.name] = provider.search_legs(legs)
+        except Exception as e:
+            print(f"[ERROR] Provider {provider.name}: {e}")
+            rows_by_provider[provider.name] = {}
+
+    threaded = [p for p in providers if not p.thread_bound]
+    inline = [p for p in providers if p.thread_bound]
+
+    with ThreadPoolExecutor(max_workers=max(1, len(threaded))) as executor:
+        futures = [executor.submit(_run, provider) for provider in threaded]
+
+        for provider in inline:
+            _run(provider)
+
+        for future in futures:
+            future.result()
+
+    merged: dict[LegRequest, list[dict]] = {}
+    for leg in legs:
+        # Providers in their configured order, so price ties are deterministic.
+        merged[leg] = _merge_provider_rows(
+            {p.name: rows_by_provider.get(p.name, {}).get(leg, []) for p in providers}
+        )
+
+    for provider in providers:
+        hits = sum(1 for rows in rows_by_provider.get(provider.name, {}).values() if rows)
+        print(f"[INFO] Provider {provider.name}: rows for {hits}/{len(legs)} legs")
+
+    return merged
+
+
+def search_weekends(
+    pairs: List[Tuple[date, date]],
+    providers: list[FlightProvider],
+    allow_klm_from_ams: bool = False,
+    progress: RunProgress | None = None,
+) -> list[dict]:
+    """
+    Like `search_google_flights`, but fanned out across `providers`. With
+    `progress`, legs are checkpointed once every provider has answered; the
+    time budget is only checked before the fan-out starts.
+    """
+    leg_cache: dict[tuple[str, str, date, bool], list[dict]] = {}
+    legs: list[LegRequest] = []
+
+    for origin, destination, leg_date in plan_leg_searches(pairs):
+        cache_key = (origin, destination, leg_date, allow_klm_from_ams)
+        rows = progress.completed(cache_key) if progress is not None else None
+        if rows is None:
+            legs.append(LegRequest(*cache_key))
+        else:
+            leg_cache[cache_key] = rows
+
+    if legs and progress is not None and progress.expired():
+        print(f"[INFO] Time budget used up; not starting {len(legs)} legs")
+        progress.record_skipped(
+            [(leg.origin, leg.destination, leg.leg_date, leg.allow_klm_from_ams) for leg in legs],
+            "time_budget",
+        )
+        legs = []
+
+    merged = fan_out_leg_search(providers, legs) if legs else {}
+
+    for leg, rows in merged.items():
+        cache_key = (leg.origin, leg.destination, leg.leg_date, leg.allow_klm_from_ams)
+        leg_cache[cache_key] = rows
+        if progress is not None:
+            progress.record(cache_key, rows)
+
+    return assemble_weekend_rows(pairs, leg_cache, allow_klm_from_ams)
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# Default budget per domain; RATE_LIMITS overrides it per domain, e.g.
+# "google.com=30:4,skyscanner.net=10:2" (requests per minute : burst).
+# Limits are for the whole run: sharded runs split them between the shard
+# processes (see RateLimiter.split).
+RATE_LIMIT_RPM = float(os.environ.get("RATE_LIMIT_RPM", "30"))
+RATE_LIMIT_BURST = int(os.environ.get("RATE_LIMIT_BURST", "4"))
+RATE_LIMIT_JITTER_S = float(os.environ.get("RATE_LIMIT_JITTER_S", "1.5"))
+
+# On a block page the domain's rate is multiplied by SLOWDOWN_FACTOR (down to
+# MIN_RPM); every clean response wins back RECOVERY_STEP of the configured rate.
+SLOWDOWN_FACTOR = 0.5
+MIN_RPM = 2.0
+RECOVERY_STEP = 0.1
+
+BLOCK_URL_MARKERS = ["/sorry/", "captcha", "/blocked"]
+BLOCK_TITLE_MARKERS = [
+    "unusual traffic",
+    "are you a person or a robot",
+    "captcha",
+    "access denied",
+    "too many requests",
+]
+
+
+def _parse_domain_limits(raw: str) -> dict[str, tuple[float, int]]:
+    limits: dict[str, tuple[float, int]] = {}
+
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        domain, _, spec = item.partition("=")
+        rpm, _, burst = spec.partition(":")
+        try:
+            limits[domain.strip().lower()] = (float(rpm), int(burst or RATE_LIMIT_BURST))
+        except ValueError:
+            print(f"[ERROR] Invalid RATE_LIMITS entry {item!r}, ignoring")
+
+    return limits
+
+
+def domain_of(url: str) -> str:
+    """Registrable-ish domain: www.google.com and google.com share a bucket."""
+    host = (urlsplit(url).hostname or url).lower()
+    parts = host.split(".")
+    if len(parts) <= 2 or host.replace(".", "").isdigit():
+        return host
+    return ".".join(parts[-2:])
+
+
+class TokenBucket:
+    def __init__(self, rpm: float, burst: int) -> None:
+        self.base_rpm = rpm
+        self.rpm = rpm
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rpm / 60.0)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token; returns how long the caller must sleep before using it."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens * 60.0 / self.rpm
+
+    def slow_down(self) -> None:
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rpm = max(MIN_RPM, self.rpm * SLOWDOWN_FACTOR)
+            # Drop the saved-up burst as well, so the next request waits.
+            self.tokens = min(self.tokens, 0.0)
+
+    def recover(self) -> None:
+        with self.lock:
+            if self.rpm < self.base_rpm:
+                self._refill(time.monotonic())
+                self.rpm = min(self.base_rpm, self.rpm + self.base_rpm * RECOVERY_STEP)
+
+
+class RateLimiter:
+    """
+    One token bucket per domain, shared by every scraper thread in the
+    process. Call `wait(url)` before a request and `report(url, blocked)`
+    after it.
+    """
+
+    def __init__(
+        self,
+        rpm: float = RATE_LIMIT_RPM,
+        burst: int = RATE_LIMIT_BURST,
+        jitter_s: float = RATE_LIMIT_JITTER_S,
+        domain_limits: dict[str, tuple[float, int]] | None = None,
+    ) -> None:
+        self.rpm = rpm
+        self.burst = burst
+        self.jitter_s = jitter_s
+        self.domain_limits = domain_limits or {}
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, domain: str) -> TokenBucket:
+        with self._lock:
+            if domain not in self._buckets:
+                rpm, burst = self.domain_limits.get(domain, (self.rpm, self.burst))
+                self._buckets[domain] = TokenBucket(rpm, burst)
+            return self._buckets[domain]
+
+    def split(self, parts: int) -> None:
+        """
+        Keep 1/parts of every budget, in each of `parts` processes that share
+        the same domains. Bursts are rounded down but stay at least 1.
+        """
+        with self._lock:
+            self.rpm /= parts
+            self.burst = max(1, self.burst // parts)
+            self.domain_limits = {
+                domain: (rpm / parts, max(1, burst // parts))
+                for domain, (rpm, burst) in self.domain_limits.items()
+            }
+            self._buckets.clear()
+
+    def wait(self, url: str) -> float:
+        bucket = self._bucket(domain_of(url))
+        delay = bucket.reserve()
+        if delay > 0 and self.jitter_s > 0:
+            delay += random.uniform(0, self.jitter_s)
+
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def report(self, url: str, blocked: bool) -> None:
+        domain = domain_of(url)
+        bucket = self._bucket(domain)
+
+        if blocked:
+            bucket.slow_down()
+            print(f"[ERROR] Block page from {domain}; slowing down to {bucket.rpm:.1f} req/min")
+        else:
+            bucket.recover()
+
+
+RATE_LIMITER = RateLimiter(domain_limits=_parse_domain_limits(os.environ.get("RATE_LIMITS", "")))
+
+
+def block_page_detected(page) -> bool:
+    """Captcha / "unusual traffic" pages, judged from the URL and title only."""
+    try:
+        url = page.url.lower()
+        if any(marker in url for marker in BLOCK_URL_MARKERS):
+            return True
+        title = page.title().lower()
+    except Exception:
+        return False
+
+    return any(marker in title for marker in BLOCK_TITLE_MARKERS)
+
+
+class BlockedPageError(RuntimeError):
+    """The site answered with a block page or HTTP 429 instead of results."""
+
+
+def throttled_goto(page, url: str, **kwargs):
+    """
+    `page.goto` behind the shared rate limiter, feeding back block pages.
+    Raises BlockedPageError on one, so the caller counts the request as failed.
+    """
+    RATE_LIMITER.wait(url)
+    return checked_goto(page, url, **kwargs)
+
+
+def checked_goto(page, url: str, **kwargs):
+    """
+    The part of `throttled_goto` after the rate limiter: for callers that
+    took their token with `RATE_LIMITER.wait` before starting a timeout.
+    """
+    response = page.goto(url, **kwargs)
+
+    blocked = block_page_detected(page) or (response is not None and response.status == 429)
+    RATE_LIMITER.report(url, blocked)
+
+    if blocked:
+        status = response.status if response is not None else "unknown"
+        raise BlockedPageError(f"Block page from {domain_of(url)} (HTTP {status})")
+    return response
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import os
+
+
+# The scrapers only read text (body / card inner_text), so anything that is
+# purely visual or tracking can be aborted before it hits the network.
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+BLOCKED_URL_PATTERNS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "play.google.com/log",
+    "/gen_204",
+    "/client_204",
+    "facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "optimizely.com",
+    "segment.io",
+]
+
+# Always let these through, even if they match a blocked type or pattern.
+# Consent pages and the results XHRs must keep working.
+ALLOWED_URL_PATTERNS = [
+    "consent.google.com",
+    "/travel/flights",
+    "/_/FlightsFrontendUi/",
+]
+
+
+def resource_blocking_enabled() -> bool:
+    return os.environ.get("SCRAPER_BLOCK_RESOURCES", "1") != "0"
+
+
+def install_resource_blocking(
+    target,
+    blocked_types: set[str] | None = None,
+    blocked_patterns: list[str] | None = None,
+    allowed_patterns: list[str] | None = None,
+) -> None:
+    """
+    Abort image/font/media and analytics requests on a Playwright context
+    (or page) via `route`. Set SCRAPER_BLOCK_RESOURCES=0 to disable, e.g.
+    when debug screenshots need to show the real page.
+    """
+    if not resource_blocking_enabled():
+        return
+
+    blocked_types = BLOCKED_RESOURCE_TYPES if blocked_types is None else blocked_types
+    blocked_patterns = BLOCKED_URL_PATTERNS if blocked_patterns is None else blocked_patterns
+    allowed_patterns = ALLOWED_URL_PATTERNS if allowed_patterns is None else allowed_patterns
+
+    def _handle(route) -> None:
+        request = route.request
+        url = request.url
+
+        try:
+            if any(p in url for p in allowed_patterns):
+                route.continue_()
+            elif request.resource_type in blocked_types:
+                route.abort()
+            elif any(p in url for p in blocked_patterns):
+                route.abort()
+            else:
+                route.continue_()
+        except Exception:
+            # The page may have navigated away while the request was pending.
+            pass
+
+    target.route("**/*", _handle)
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import re
+from datetime import date
+
 from playwright.sync_api import sync_playwright
-from src.models import FlightOption, Route, DatePair
+from src.models import FlightOption, LegRequest, Route, DatePair
+from src.scrapers.flight_rules import flight_ok, parse_price
+from src.scrapers.rate_limiter import throttled_goto
+from src.scrapers.resource_blocking import install_resource_blocking
 
 
 def build_skyscanner_url(origin: str, destination: str, outbound: str, inbound: str) -> str:
@@ -26,6 +32,7 @@ def scrape_skyscanner(routes: list[Route], pairs: list[DatePair]) -> list[Flight
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
         page = browser.new_page()
+        install_resource_blocking(page)
 
         for route in routes:
             for pair in pairs:
@@ -40,7 +47,7 @@ def scrape_skyscanner(routes: list[Route], pairs: list[DatePair]) -> list[Flight
                 print("Searching:", url)
 
                 try:
-                    page.goto(url, timeout=60000)
+                    throttled_goto(page, url, timeout=60000)
 
                     page.wait_for_timeout(8000)
 
@@ -81,3 +88,145 @@ def scrape_skyscanner(routes: list[Route], pairs: list[DatePair]) -> list[Flight
         browser.close()
 
     return results
+
+
+# Names recognised in card text; which ones are kept is up to flight_rules.
+KNOWN_AIRLINES = ["Vueling", "Transavia", "KLM"]
+
+# Sube desde cada precio hasta el contenedor de la tarjeta (el primer
+# ancestro con hora de salida y de llegada) y devuelve su texto.
+_COLLECT_CARDS_JS = """
+() => {
+  const seen = new Set();
+  const cards = [];
+  const timeRe = /\\b\\d{1,2}:\\d{2}\\b[\\s\\S]*\\b\\d{1,2}:\\d{2}\\b/;
+
+  for (const priceEl of document.querySelectorAll("[data-test-id='price'], [data-testid='price']")) {
+    let el = priceEl;
+    for (let i = 0; i < 8 && el; i++) {
+      const text = (el.innerText || "").trim();
+      if (timeRe.test(text)) {
+        if (!seen.has(text)) {
+          seen.add(text);
+          const link = el.querySelector("a[href]") || el.closest("a[href]");
+          cards.push({text, href: link ? link.href : null});
+        }
+        break;
+      }
+      el = el.parentElement;
+    }
+  }
+
+  return cards;
+}
+"""
+
+
+def build_skyscanner_oneway_url(origin: str, destination: str, leg_date: date) -> str:
+    """
+    URL de búsqueda solo ida. Skyscanner usa fechas yymmdd en la ruta.
+    """
+    return (
+        f"https://www.skyscanner.net/transport/flights/"
+        f"{origin.lower()}/{destination.lower()}/"
+        f"{leg_date.strftime('%y%m%d')}/?adultsv2=1&cabinclass=economy&rtn=0"
+    )
+
+
+def _parse_leg_card(text: str, leg: LegRequest) -> dict | None:
+    lower = text.lower()
+
+    airline = next((a for a in KNOWN_AIRLINES if a.lower() in lower), None)
+    if airline is None:
+        return None
+
+    if "direct" not in lower and "nonstop" not in lower:
+        return None
+
+    times = re.findall(r"\b(?:[01]?\d|2[0-3]):[0-5]\d\b", text)
+    if len(times) < 2:
+        return None
+
+    price = parse_price(text)
+    if price is None:
+        return None
+
+    if not flight_ok(
+        leg.origin,
+        leg.destination,
+        leg.leg_date,
+        airline,
+        times[0],
+        price,
+        leg.allow_klm_from_ams,
+    ):
+        return None
+
+    return {
+        "airline": airline,
+        "departure_time": times[0],
+        "arrival_time": times[1],
+        "price": price,
+    }
+
+
+def scrape_skyscanner_legs(legs: list[LegRequest]) -> dict[LegRequest, list[dict]]:
+    """
+    Busca cada tramo solo ida y devuelve filas con la misma forma que
+    `google_flights_ui._parse_leg` (directos, aerolíneas permitidas).
+    """
+    results: dict[LegRequest, list[dict]] = {}
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        install_resource_blocking(page)
+
+        for leg in legs:
+            url = build_skyscanner_oneway_url(leg.origin, leg.destination, leg.leg_date)
+            print("Searching:", url)
+
+            results[leg] = []
+
+            try:
+                throttled_goto(page, url, timeout=60000)
+                page.wait_for_timeout(8000)
+
+                cards = page.evaluate(_COLLECT_CARDS_JS)
+                page_title = page.title()
+
+                parsed = []
+                for card in cards:
+                    row = _parse_leg_card(card["text"], leg)
+                    if row is not None:
+                        parsed.append((row, card))
+
+                parsed.sort(key=lambda item: (item[0]["price"], item[0]["departure_time"]))
+
+                for row, card in parsed[:5]:
+                    results[leg].append(
+                        {
+                            "origin": leg.origin,
+                            "destination": leg.destination,
+                            "leg_date": leg.leg_date,
+                            "leg_type": leg.leg_type,
+                            "airline": row["airline"],
+                            "outbound_departure": row["departure_time"],
+                            "outbound_arrival": row["arrival_time"],
+                            "inbound_departure": "N/A",
+                            "inbound_arrival": "N/A",
+                            "outbound_flight_no": "N/A",
+                            "inbound_flight_no": "N/A",
+                            "price": row["price"],
+                            "source_url": card.get("href") or url,
+                            "page_title": page_title,
+                            "raw_text": card["text"][:2000],
+                        }
+                    )
+
+            except Exception as e:
+                print("Error scraping", url, e)
+
+        browser.close()
+
+    return results
@@ -6,6 +6,11 @@ from datetime import datetime
 
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 
+from src.scrapers.browser_state import consent_wall_detected, save_storage_state, storage_state_kwargs
+from src.scrapers.flight_rules import parse_price
+from src.scrapers.rate_limiter import throttled_goto
+from src.scrapers.resource_blocking import install_resource_blocking
+
 
 DEBUG_DIR = Path("debug")
 
@@ -26,8 +31,9 @@ def _click_if_present(page, selectors: list[str], timeout: int = 2000) -> bool:
     return False
 
 
-def _maybe_handle_google_interstitials(page) -> None:
-    _click_if_present(
+def _maybe_handle_google_interstitials(page) -> bool:
+    """True when a button was clicked, i.e. there is new state worth saving."""
+    proceeded = _click_if_present(
         page,
         [
             "text='Proceed anyway'",
@@ -38,7 +44,7 @@ def _maybe_handle_google_interstitials(page) -> None:
         timeout=3000,
     )
 
-    _click_if_present(
+    accepted = _click_if_present(
         page,
         [
             "button:has-text('Accept all')",
@@ -49,6 +55,8 @@ def _maybe_handle_google_interstitials(page) -> None:
         timeout=3000,
     )
 
+    return proceeded or accepted
+
 
 def _build_google_flights_url(origin: str, outbound: str, inbound: str) -> str:
     # Formato legacy muy usado para precargar búsquedas.
@@ -76,19 +84,6 @@ def _has_zero_stops(text: str) -> bool:
     )
 
 
-def _extract_price(text: str) -> float | None:
-    # Casos: €180, EUR 180, 180 €
-    matches = re.findall(r"(?:€|EUR\s?)(\d{1,4}(?:[.,]\d{1,2})?)|(\d{1,4}(?:[.,]\d{1,2})?)\s?€", text)
-    for a, b in matches:
-        raw = a or b
-        raw = raw.replace(",", ".")
-        try:
-            return float(raw)
-        except ValueError:
-            pass
-    return None
-
-
 def _extract_times(text: str) -> tuple[str | None, str | None]:
     times = re.findall(r"\b([01]?\d|2[0-3]):[0-5]\d\b", text)
     full_times = re.findall(r"\b(?:[01]?\d|2[0-3]):[0-5]\d\b", text)
@@ -107,18 +102,58 @@ def _departure_ok(dep_time: str | None) -> bool:
         return False
 
 
-def _collect_candidate_cards(page) -> list[str]:
-    selectors = [
-        "[role='listitem']",
-        "li",
-        "div[role='main'] div",
-        "[jscontroller]",
-    ]
-
+CARD_SELECTORS = [
+    "[role='listitem']",
+    "li",
+    "div[role='main'] div",
+    "[jscontroller]",
+]
+
+# IATA codes of the airlines we care about (Vueling, Transavia, KLM).
+FLIGHT_NO_PATTERN = r"\b(?:VY|HV|TO|KL)\s?\d{2,4}\b"
+
+# Runs inside the page: one IPC round-trip instead of one inner_text() call
+# per element. Mirrors the limits of the old locator loop (120 elements per
+# selector, texts shorter than 40 chars dropped, first occurrence wins).
+_COLLECT_CARDS_JS = """
+({selectors, limit, minLength, flightNoPattern}) => {
+  const seen = new Set();
+  const cards = [];
+  const flightNoRe = new RegExp(flightNoPattern, "g");
+
+  for (const selector of selectors) {
+    let elements;
+    try {
+      elements = document.querySelectorAll(selector);
+    } catch (e) {
+      continue;
+    }
+
+    const count = Math.min(elements.length, limit);
+    for (let i = 0; i < count; i++) {
+      const text = (elements[i].innerText || "").trim();
+      if (text.length < minLength || seen.has(text)) {
+        continue;
+      }
+      seen.add(text);
+
+      const flightNumbers = [...new Set(
+        (text.match(flightNoRe) || []).map((n) => n.replace(/\\s+/g, ""))
+      )];
+      cards.push({text, flight_numbers: flightNumbers});
+    }
+  }
+
+  return cards;
+}
+"""
+
+
+def _collect_candidate_cards_slow(page) -> list[dict]:
     texts: list[str] = []
     seen: set[str] = set()
 
-    for selector in selectors:
+    for selector in CARD_SELECTORS:
         try:
             locator = page.locator(selector)
             count = min(locator.count(), 120)
@@ -138,7 +173,31 @@ def _collect_candidate_cards(page) -> list[str]:
         except Exception:
             pass
 
-    return texts
+    return [
+        {
+            "text": t,
+            "flight_numbers": list(dict.fromkeys(
+                re.sub(r"\s+", "", n) for n in re.findall(FLIGHT_NO_PATTERN, t)
+            )),
+        }
+        for t in texts
+    ]
+
+
+def _collect_candidate_cards(page) -> list[dict]:
+    try:
+        return page.evaluate(
+            _COLLECT_CARDS_JS,
+            {
+                "selectors": CARD_SELECTORS,
+                "limit": 120,
+                "minLength": 40,
+                "flightNoPattern": FLIGHT_NO_PATTERN,
+            },
+        )
+    except Exception as e:
+        print(f"[ERROR] Batched card extraction failed, using locators: {e}")
+        return _collect_candidate_cards_slow(page)
 
 
 def _parse_cards(
@@ -147,17 +206,20 @@ def _parse_cards(
     inbound,
     final_url: str,
     page_title: str,
-    card_texts: list[str],
+    cards: list[dict],
 ) -> list[dict]:
     rows: list[dict] = []
 
-    for text in card_texts:
+    for card in cards:
+        text = card["text"]
+        flight_numbers = card.get("flight_numbers") or []
+
         if not _is_allowed_airline(text):
             continue
         if not _has_zero_stops(text):
             continue
 
-        price = _extract_price(text)
+        price = parse_price(text)
         if price is None:
             continue
 
@@ -177,8 +239,8 @@ def _parse_cards(
             "outbound_arrival": arr_time or "N/A",
             "inbound_departure": "N/A",
             "inbound_arrival": "N/A",
-            "outbound_flight_no": "N/A",
-            "inbound_flight_no": "N/A",
+            "outbound_flight_no": flight_numbers[0] if flight_numbers else "N/A",
+            "inbound_flight_no": flight_numbers[1] if len(flight_numbers) > 1 else "N/A",
             "price": price,
             "source_url": final_url,
             "page_title": page_title,
@@ -213,7 +275,9 @@ def search_google_flights(pairs) -> list[dict]:
                 "Chrome/122.0.0.0 Safari/537.36"
             ),
             viewport={"width": 1440, "height": 2600},
+            **storage_state_kwargs(),
         )
+        install_resource_blocking(context)
 
         page = context.new_page()
 
@@ -230,10 +294,11 @@ def search_google_flights(pairs) -> list[dict]:
 
                 try:
                     print(f"[INFO] Opening {url}")
-                    response = page.goto(url, wait_until="domcontentloaded", timeout=90000)
+                    response = throttled_goto(page, url, wait_until="domcontentloaded", timeout=90000)
 
                     page.wait_for_timeout(5000)
-                    _maybe_handle_google_interstitials(page)
+                    if consent_wall_detected(page) and _maybe_handle_google_interstitials(page):
+                        save_storage_state(context)
                     page.wait_for_timeout(7000)
 
                     final_url = page.url
@@ -252,7 +317,7 @@ def search_google_flights(pairs) -> list[dict]:
                     page.screenshot(path=str(screenshot_path), full_page=True)
                     html_path.write_text(page.content(), encoding="utf-8")
 
-                    card_texts = _collect_candidate_cards(page)
+                    cards = _collect_candidate_cards(page)
 
                     log_lines = [
                         f"REQUEST_URL: {url}",
@@ -262,7 +327,7 @@ def search_google_flights(pairs) -> list[dict]:
                         "",
                         "=== CANDIDATE TEXT BLOCKS ===",
                     ]
-                    log_lines.extend(card_texts[:50])
+                    log_lines.extend(card["text"] for card in cards[:50])
 
                     txt_path.write_text("\n".join(log_lines), encoding="utf-8")
 
@@ -272,7 +337,7 @@ def search_google_flights(pairs) -> list[dict]:
                         inbound=inbound,
                         final_url=final_url,
                         page_title=page_title,
-                        card_texts=card_texts,
+                        cards=cards,
                     )
 
                     print(f"[INFO] {label}: parsed {len(parsed)} rows")
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import json
 import sqlite3
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
 
@@ -12,6 +14,331 @@ def get_conn():
     return sqlite3.connect(DB_PATH)
 
 
+INDEXES = [
+    # get_weekend_history / get_weekend_summaries, the per-run replace in
+    # StoreSession.flush and the weekend_stats triggers
+    """
+    CREATE INDEX IF NOT EXISTS idx_weekend_prices_pair
+    ON weekend_prices (outbound, inbound, run_date)
+    """,
+    # get_latest_learning_opportunities: MAX(run_date), then ordered by combo
+    """
+    CREATE INDEX IF NOT EXISTS idx_learning_prices_run
+    ON learning_prices (run_date, best_combo)
+    """,
+    # learning_stats triggers: min / max / latest combo per pattern and
+    # days_to_departure when a sample is replaced
+    """
+    CREATE INDEX IF NOT EXISTS idx_learning_prices_pattern
+    ON learning_prices (pattern, days_to_departure, best_combo)
+    """,
+    # get_leg_observations: every run's options for one leg
+    """
+    CREATE INDEX IF NOT EXISTS idx_leg_observations_leg
+    ON leg_observations (origin_id, destination_id, leg_day)
+    """,
+]
+
+# Running aggregates per weekend and per (pattern, days_to_departure), kept
+# in step with weekend_prices / learning_prices by the triggers below, in the
+# same transaction as the write. Sums and counts are adjusted on delete;
+# a deleted min, max or latest value is looked up again through the indexes.
+STATS_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS weekend_stats (
+        outbound TEXT NOT NULL,
+        inbound TEXT NOT NULL,
+        run_count INTEGER NOT NULL,
+        combo_count INTEGER NOT NULL,
+        combo_sum REAL NOT NULL,
+        min_outbound REAL,
+        min_inbound REAL,
+        min_combo REAL,
+        max_combo REAL,
+        last_run_date TEXT,
+        last_combo REAL,
+        PRIMARY KEY (outbound, inbound)
+    ) WITHOUT ROWID
+    """,
+    # Priced samples only, like get_learning_stats.
+    """
+    CREATE TABLE IF NOT EXISTS learning_stats (
+        pattern TEXT NOT NULL,
+        days_to_departure INTEGER NOT NULL,
+        combo_count INTEGER NOT NULL,
+        combo_sum REAL NOT NULL,
+        min_combo REAL,
+        max_combo REAL,
+        last_run_date TEXT,
+        last_combo REAL,
+        PRIMARY KEY (pattern, days_to_departure)
+    ) WITHOUT ROWID
+    """,
+]
+
+# Fills the stats tables the first time they are created on an existing DB.
+STATS_BACKFILL = {
+    "weekend_stats": """
+        INSERT INTO weekend_stats
+        SELECT
+            outbound,
+            inbound,
+            COUNT(*),
+            COUNT(best_combo),
+            COALESCE(SUM(best_combo), 0),
+            MIN(best_outbound),
+            MIN(best_inbound),
+            MIN(best_combo),
+            MAX(best_combo),
+            MAX(run_date),
+            (
+                SELECT l.best_combo FROM weekend_prices l
+                WHERE l.outbound = w.outbound AND l.inbound = w.inbound
+                ORDER BY l.run_date DESC, l.rowid DESC
+                LIMIT 1
+            )
+        FROM weekend_prices w
+        GROUP BY outbound, inbound
+    """,
+    "learning_stats": """
+        INSERT INTO learning_stats
+        SELECT
+            pattern,
+            days_to_departure,
+            COUNT(*),
+            SUM(best_combo),
+            MIN(best_combo),
+            MAX(best_combo),
+            MAX(run_date),
+            (
+                SELECT l.best_combo FROM learning_prices l
+                WHERE l.pattern = p.pattern
+                  AND l.days_to_departure = p.days_to_departure
+                  AND l.best_combo IS NOT NULL
+                ORDER BY l.run_date DESC, l.rowid DESC
+                LIMIT 1
+            )
+        FROM learning_prices p
+        WHERE pattern IS NOT NULL
+          AND days_to_departure IS NOT NULL
+          AND best_combo IS NOT NULL
+        GROUP BY pattern, days_to_departure
+    """,
+}
+
+# The store only inserts and deletes snapshot rows, never updates them.
+STATS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS weekend_stats_insert
+    AFTER INSERT ON weekend_prices
+    BEGIN
+        INSERT INTO weekend_stats VALUES (
+            NEW.outbound,
+            NEW.inbound,
+            1,
+            NEW.best_combo IS NOT NULL,
+            COALESCE(NEW.best_combo, 0),
+            NEW.best_outbound,
+            NEW.best_inbound,
+            NEW.best_combo,
+            NEW.best_combo,
+            NEW.run_date,
+            NEW.best_combo
+        )
+        ON CONFLICT (outbound, inbound) DO UPDATE SET
+            run_count = run_count + 1,
+            combo_count = combo_count + excluded.combo_count,
+            combo_sum = combo_sum + excluded.combo_sum,
+            min_outbound = COALESCE(MIN(min_outbound, excluded.min_outbound), min_outbound, excluded.min_outbound),
+            min_inbound = COALESCE(MIN(min_inbound, excluded.min_inbound), min_inbound, excluded.min_inbound),
+            min_combo = COALESCE(MIN(min_combo, excluded.min_combo), min_combo, excluded.min_combo),
+            max_combo = COALESCE(MAX(max_combo, excluded.max_combo), max_combo, excluded.max_combo),
+            last_combo = CASE
+                WHEN excluded.last_run_date >= last_run_date THEN excluded.last_combo
+                ELSE last_combo
+            END,
+            last_run_date = MAX(last_run_date, excluded.last_run_date);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS weekend_stats_delete
+    AFTER DELETE ON weekend_prices
+    BEGIN
+        UPDATE weekend_stats SET
+            run_count = run_count - 1,
+            combo_count = combo_count - (OLD.best_combo IS NOT NULL),
+            combo_sum = combo_sum - COALESCE(OLD.best_combo, 0),
+            min_outbound = CASE
+                WHEN OLD.best_outbound <= min_outbound THEN (
+                    SELECT MIN(best_outbound) FROM weekend_prices
+                    WHERE outbound = OLD.outbound AND inbound = OLD.inbound
+                )
+                ELSE min_outbound
+            END,
+            min_inbound = CASE
+                WHEN OLD.best_inbound <= min_inbound THEN (
+                    SELECT MIN(best_inbound) FROM weekend_prices
+                    WHERE outbound = OLD.outbound AND inbound = OLD.inbound
+                )
+                ELSE min_inbound
+            END,
+            min_combo = CASE
+                WHEN OLD.best_combo <= min_combo THEN (
+                    SELECT MIN(best_combo) FROM weekend_prices
+                    WHERE outbound = OLD.outbound AND inbound = OLD.inbound
+                )
+                ELSE min_combo
+            END,
+            max_combo = CASE
+                WHEN OLD.best_combo >= max_combo THEN (
+                    SELECT MAX(best_combo) FROM weekend_prices
+                    WHERE outbound = OLD.outbound AND inbound = OLD.inbound
+                )
+                ELSE max_combo
+            END,
+            last_run_date = CASE
+                WHEN OLD.run_date >= last_run_date THEN (
+                    SELECT MAX(run_date) FROM weekend_prices
+                    WHERE outbound = OLD.outbound AND inbound = OLD.inbound
+                )
+                ELSE last_run_date
+            END,
+            last_combo = CASE
+                WHEN OLD.run_date >= last_run_date THEN (
+                    SELECT best_combo FROM weekend_prices
+                    WHERE outbound = OLD.outbound AND inbound = OLD.inbound
+                    ORDER BY run_date DESC, rowid DESC
+                    LIMIT 1
+                )
+                ELSE last_combo
+            END
+        WHERE outbound = OLD.outbound AND inbound = OLD.inbound;
+
+        DELETE FROM weekend_stats
+        WHERE outbound = OLD.outbound AND inbound = OLD.inbound AND run_count = 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS learning_stats_insert
+    AFTER INSERT ON learning_prices
+    WHEN NEW.best_combo IS NOT NULL AND NEW.pattern IS NOT NULL AND NEW.days_to_departure IS NOT NULL
+    BEGIN
+        INSERT INTO learning_stats VALUES (
+            NEW.pattern,
+            NEW.days_to_departure,
+            1,
+            NEW.best_combo,
+            NEW.best_combo,
+            NEW.best_combo,
+            NEW.run_date,
+            NEW.best_combo
+        )
+        ON CONFLICT (pattern, days_to_departure) DO UPDATE SET
+            combo_count = combo_count + 1,
+            combo_sum = combo_sum + excluded.combo_sum,
+            min_combo = MIN(min_combo, excluded.min_combo),
+            max_combo = MAX(max_combo, excluded.max_combo),
+            last_combo = CASE
+                WHEN excluded.last_run_date >= last_run_date THEN excluded.last_combo
+                ELSE last_combo
+            END,
+            last_run_date = MAX(last_run_date, excluded.last_run_date);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS learning_stats_delete
+    AFTER DELETE ON learning_prices
+    WHEN OLD.best_combo IS NOT NULL AND OLD.pattern IS NOT NULL AND OLD.days_to_departure IS NOT NULL
+    BEGIN
+        UPDATE learning_stats SET
+            combo_count = combo_count - 1,
+            combo_sum = combo_sum - OLD.best_combo,
+            min_combo = CASE
+                WHEN OLD.best_combo <= min_combo THEN (
+                    SELECT MIN(best_combo) FROM learning_prices
+                    WHERE pattern = OLD.pattern AND days_to_departure = OLD.days_to_departure
+                )
+                ELSE min_combo
+            END,
+            max_combo = CASE
+                WHEN OLD.best_combo >= max_combo THEN (
+                    SELECT MAX(best_combo) FROM learning_prices
+                    WHERE pattern = OLD.pattern AND days_to_departure = OLD.days_to_departure
+                )
+                ELSE max_combo
+            END,
+            last_run_date = CASE
+                WHEN OLD.run_date >= last_run_date THEN (
+                    SELECT MAX(run_date) FROM learning_prices
+                    WHERE pattern = OLD.pattern
+                      AND days_to_departure = OLD.days_to_departure
+                      AND best_combo IS NOT NULL
+                )
+                ELSE last_run_date
+            END,
+            last_combo = CASE
+                WHEN OLD.run_date >= last_run_date THEN (
+                    SELECT best_combo FROM learning_prices
+                    WHERE pattern = OLD.pattern
+                      AND days_to_departure = OLD.days_to_departure
+                      AND best_combo IS NOT NULL
+                    ORDER BY run_date DESC, rowid DESC
+                    LIMIT 1
+                )
+                ELSE last_combo
+            END
+        WHERE pattern = OLD.pattern AND days_to_departure = OLD.days_to_departure;
+
+        DELETE FROM learning_stats
+        WHERE pattern = OLD.pattern AND days_to_departure = OLD.days_to_departure AND combo_count = 0;
+    END
+    """,
+]
+
+EPOCH = date(1970, 1, 1)
+
+CALENDAR_PROVIDER = "google_calendar"
+CALENDAR_AIRLINE = "*"
+CALENDAR_DEPARTURE_MIN = -1
+
+
+def _day_number(value) -> int:
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return (value - EPOCH).days
+
+
+def _from_day_number(day: int) -> date:
+    return EPOCH + timedelta(days=day)
+
+
+def _clock_minutes(value) -> int | None:
+    """'4:05 PM', '4:05\u202fPM+1' or '16:05' -> minutes after midnight."""
+    if not value:
+        return None
+
+    text = str(value).replace("\u202f", " ").replace("\xa0", " ").strip().upper()
+    next_day = text.endswith("+1")
+    text = text.removesuffix("+1").strip()
+
+    for fmt in ("%I:%M %p", "%H:%M"):
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return parsed.hour * 60 + parsed.minute + (1440 if next_day else 0)
+
+    return None
+
+
+def _fmt_minutes(minutes: int | None) -> str | None:
+    if minutes is None or minutes < 0:
+        return None
+    suffix = "+1" if minutes >= 1440 else ""
+    minutes %= 1440
+    return f"{minutes // 60:02d}:{minutes % 60:02d}{suffix}"
+
+
 def _columns(cur, table_name: str) -> set[str]:
     cur.execute(f"PRAGMA table_info({table_name})")
     return {row[1] for row in cur.fetchall()}
@@ -50,6 +377,72 @@ def init_db():
         """
     )
 
+    # One row per leg finished during a run, so an interrupted run can resume.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS run_progress (
+            run_date TEXT,
+            origin TEXT,
+            destination TEXT,
+            leg_date TEXT,
+            allow_klm_from_ams INTEGER,
+            rows_json TEXT,
+            completed_at TEXT,
+            PRIMARY KEY (run_date, origin, destination, leg_date, allow_klm_from_ams)
+        )
+        """
+    )
+
+    # Airline names, airport codes and provider names, stored once and
+    # referenced by id from leg_observations.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS dictionary (
+            id INTEGER PRIMARY KEY,
+            value TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+
+    # Every parsed flight option, compactly encoded: days since 1970-01-01,
+    # minutes after midnight (arrivals past midnight run over 1440) and
+    # euro cents. Readable dates: date(run_day * 86400, 'unixepoch').
+    # Calendar-sweep fares are the day's lowest price with no flight behind
+    # it: airline CALENDAR_AIRLINE, departure_min CALENDAR_DEPARTURE_MIN.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS leg_observations (
+            run_day INTEGER NOT NULL,
+            origin_id INTEGER NOT NULL,
+            destination_id INTEGER NOT NULL,
+            leg_day INTEGER NOT NULL,
+            airline_id INTEGER NOT NULL,
+            departure_min INTEGER NOT NULL,
+            arrival_min INTEGER,
+            price_cents INTEGER NOT NULL,
+            provider_id INTEGER,
+            flight_no TEXT,
+            source_url TEXT,
+            PRIMARY KEY (run_day, origin_id, destination_id, leg_day, airline_id, departure_min)
+        ) WITHOUT ROWID
+        """
+    )
+
+    # Legs a run did not get to (time budget, circuit breaker, retries used up).
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS skipped_legs (
+            run_date TEXT,
+            origin TEXT,
+            destination TEXT,
+            leg_date TEXT,
+            allow_klm_from_ams INTEGER,
+            reason TEXT,
+            PRIMARY KEY (run_date, origin, destination, leg_date, allow_klm_from_ams)
+        )
+        """
+    )
+
     cols = _columns(cur, "learning_prices")
 
     extra_cols = {
@@ -71,10 +464,255 @@ def init_db():
         if col not in cols:
             cur.execute(f"ALTER TABLE learning_prices ADD COLUMN {col} {col_type}")
 
+    # One index per lookup pattern; `python -m src.query_plans` checks that
+    # every store query uses them.
+    for index_sql in INDEXES:
+        cur.execute(index_sql)
+
+    cur.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    existing_tables = {row[0] for row in cur.fetchall()}
+
+    for table_sql in STATS_TABLES:
+        cur.execute(table_sql)
+
+    for table_name, backfill_sql in STATS_BACKFILL.items():
+        if table_name not in existing_tables:
+            cur.execute(backfill_sql)
+
+    for trigger_sql in STATS_TRIGGERS:
+        cur.execute(trigger_sql)
+
     conn.commit()
+    # Refreshes planner statistics for the tables that changed enough.
+    cur.execute("PRAGMA optimize")
     conn.close()
 
 
+LEARNING_COLUMNS = [
+    "run_date",
+    "sample_name",
+    "outbound",
+    "inbound",
+    "days_to_departure",
+    "pattern",
+    "best_outbound",
+    "best_inbound",
+    "best_combo",
+    "outbound_origin",
+    "outbound_destination",
+    "outbound_airline",
+    "outbound_departure_time",
+    "outbound_arrival_time",
+    "outbound_source_url",
+    "inbound_origin",
+    "inbound_destination",
+    "inbound_airline",
+    "inbound_departure_time",
+    "inbound_arrival_time",
+    "inbound_source_url",
+]
+
+
+class StoreSession:
+    """
+    One connection for a whole run. Snapshots are buffered and written by
+    `flush()` with executemany in a single transaction, so each stage of a
+    run pays one commit instead of one per row. Call `flush()` at the end of
+    every stage and `close()` (or use it as a context manager) at the end.
+    """
+
+    def __init__(self) -> None:
+        self.conn = get_conn()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL only syncs at checkpoints; commits stay atomic.
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        self._weekend_rows: list[tuple] = []
+        self._learning_rows: list[tuple] = []
+        self._leg_rows: list[tuple] = []
+        self._dictionary_ids: dict[str, int] = {}
+
+    def add_weekend_snapshot(
+        self,
+        run_date,
+        outbound,
+        inbound,
+        best_outbound,
+        best_inbound,
+        best_combo,
+    ) -> None:
+        self._weekend_rows.append(
+            (
+                str(run_date),
+                str(outbound),
+                str(inbound),
+                best_outbound,
+                best_inbound,
+                best_combo,
+            )
+        )
+
+    def add_learning_snapshot(self, run_date, sample_name, outbound, inbound, **fields) -> None:
+        unknown = set(fields) - set(LEARNING_COLUMNS)
+        if unknown:
+            raise TypeError(f"Unknown learning_prices columns: {sorted(unknown)}")
+
+        values = {
+            **fields,
+            "run_date": str(run_date),
+            "sample_name": sample_name,
+            "outbound": str(outbound),
+            "inbound": str(inbound),
+        }
+        self._learning_rows.append(tuple(values.get(col) for col in LEARNING_COLUMNS))
+
+    def add_calendar_prices(self, run_date, origin, destination, prices) -> None:
+        """Buffer a calendar sweep ({leg_date: lowest price}) as leg observations."""
+        self._leg_rows.extend(
+            (
+                _day_number(run_date),
+                origin,
+                destination,
+                _day_number(leg_date),
+                CALENDAR_AIRLINE,
+                CALENDAR_DEPARTURE_MIN,
+                None,
+                round(price * 100),
+                CALENDAR_PROVIDER,
+                None,
+                None,
+            )
+            for leg_date, price in sorted(prices.items())
+        )
+
+    def add_leg_observations(self, run_date, rows) -> None:
+        """
+        Buffer scraped leg rows (the normalized scraper dicts). Weekend rows
+        repeat each leg once per pair; the unique key collapses them.
+        """
+        for row in rows:
+            departure = _clock_minutes(row.get("outbound_departure"))
+            if departure is None or row.get("price") is None:
+                continue
+
+            flight_no = row.get("outbound_flight_no")
+            self._leg_rows.append(
+                (
+                    _day_number(run_date),
+                    row["origin"],
+                    row["destination"],
+                    _day_number(row["leg_date"]),
+                    row["airline"],
+                    departure,
+                    _clock_minutes(row.get("outbound_arrival")),
+                    round(row["price"] * 100),
+                    row.get("provider"),
+                    flight_no if flight_no and flight_no != "N/A" else None,
+                    row.get("source_url") or None,
+                )
+            )
+
+    def _lookup_ids(self, values: set[str]) -> dict[str, int]:
+        missing = sorted(v for v in values if v not in self._dictionary_ids)
+        if missing:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO dictionary (value) VALUES (?)",
+                [(v,) for v in missing],
+            )
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                cur = self.conn.execute(
+                    f"SELECT value, id FROM dictionary WHERE value IN ({', '.join('?' for _ in chunk)})",
+                    chunk,
+                )
+                self._dictionary_ids.update(cur.fetchall())
+        return self._dictionary_ids
+
+    def _encode_leg_rows(self, rows: list[tuple]) -> list[tuple]:
+        ids = self._lookup_ids(
+            {v for r in rows for v in (r[1], r[2], r[4])} | {r[8] for r in rows if r[8]}
+        )
+
+        # Same flight seen twice in one batch (e.g. two providers): keep the cheapest.
+        best: dict[tuple, tuple] = {}
+        for r in rows:
+            encoded = (
+                r[0], ids[r[1]], ids[r[2]], r[3], ids[r[4]], r[5],
+                r[6], r[7], ids[r[8]] if r[8] else None, r[9], r[10],
+            )
+            key = encoded[:6]
+            if key not in best or encoded[7] < best[key][7]:
+                best[key] = encoded
+        return list(best.values())
+
+    def flush(self) -> None:
+        weekend, self._weekend_rows = self._weekend_rows, []
+        learning, self._learning_rows = self._learning_rows, []
+        legs, self._leg_rows = self._leg_rows, []
+
+        if not (weekend or learning or legs):
+            return
+
+        with self.conn:
+            # One observation per weekend / sample and run_date, so a resumed
+            # run can save again.
+            self.conn.executemany(
+                """
+                DELETE FROM weekend_prices
+                WHERE run_date = ? AND outbound = ? AND inbound = ?
+                """,
+                [row[:3] for row in weekend],
+            )
+            self.conn.executemany(
+                """
+                INSERT INTO weekend_prices VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                weekend,
+            )
+
+            self.conn.executemany(
+                """
+                DELETE FROM learning_prices
+                WHERE run_date = ? AND sample_name = ? AND outbound = ? AND inbound = ?
+                """,
+                [row[:4] for row in learning],
+            )
+            self.conn.executemany(
+                f"""
+                INSERT INTO learning_prices ({", ".join(LEARNING_COLUMNS)})
+                VALUES ({", ".join("?" for _ in LEARNING_COLUMNS)})
+                """,
+                learning,
+            )
+
+            # A rerun of the same run_date overwrites instead of duplicating.
+            self.conn.executemany(
+                """
+                INSERT INTO leg_observations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (run_day, origin_id, destination_id, leg_day, airline_id, departure_min)
+                DO UPDATE SET
+                    arrival_min = excluded.arrival_min,
+                    price_cents = excluded.price_cents,
+                    provider_id = excluded.provider_id,
+                    flight_no = excluded.flight_no,
+                    source_url = excluded.source_url
+                """,
+                self._encode_leg_rows(legs) if legs else [],
+            )
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+
+    def __enter__(self) -> StoreSession:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
 def save_weekend_snapshot(
     run_date,
     outbound,
@@ -83,109 +721,119 @@ def save_weekend_snapshot(
     best_inbound,
     best_combo,
 ):
+    with StoreSession() as session:
+        session.add_weekend_snapshot(
+            run_date,
+            outbound,
+            inbound,
+            best_outbound,
+            best_inbound,
+            best_combo,
+        )
+
+
+def save_learning_snapshot(run_date, sample_name, outbound, inbound, **fields):
+    """See `LEARNING_COLUMNS` for the optional per-leg detail fields."""
+    with StoreSession() as session:
+        session.add_learning_snapshot(run_date, sample_name, outbound, inbound, **fields)
+
+
+def save_leg_progress(run_date, origin, destination, leg_date, allow_klm_from_ams, rows):
     conn = get_conn()
     cur = conn.cursor()
 
     cur.execute(
         """
-        INSERT INTO weekend_prices VALUES (?, ?, ?, ?, ?, ?)
+        INSERT OR REPLACE INTO run_progress VALUES (?, ?, ?, ?, ?, ?, ?)
         """,
         (
             str(run_date),
-            str(outbound),
-            str(inbound),
-            best_outbound,
-            best_inbound,
-            best_combo,
+            origin,
+            destination,
+            str(leg_date),
+            int(allow_klm_from_ams),
+            json.dumps(rows, default=str),
+            datetime.now().isoformat(timespec="seconds"),
         ),
     )
 
+    # A leg skipped by an earlier attempt and completed now is no longer skipped.
+    cur.execute(
+        """
+        DELETE FROM skipped_legs
+        WHERE run_date = ? AND origin = ? AND destination = ? AND leg_date = ? AND allow_klm_from_ams = ?
+        """,
+        (str(run_date), origin, destination, str(leg_date), int(allow_klm_from_ams)),
+    )
+
     conn.commit()
     conn.close()
 
 
-def save_learning_snapshot(
-    run_date,
-    sample_name,
-    outbound,
-    inbound,
-    days_to_departure,
-    pattern,
-    best_outbound,
-    best_inbound,
-    best_combo,
-    outbound_origin=None,
-    outbound_destination=None,
-    outbound_airline=None,
-    outbound_departure_time=None,
-    outbound_arrival_time=None,
-    outbound_source_url=None,
-    inbound_origin=None,
-    inbound_destination=None,
-    inbound_airline=None,
-    inbound_departure_time=None,
-    inbound_arrival_time=None,
-    inbound_source_url=None,
-):
+def clear_leg_progress(run_date, keep_current: bool = True):
+    """
+    Drop checkpoints and skipped legs from earlier runs; they only matter
+    while their own run_date can still be resumed. With keep_current=False
+    the rows of `run_date` itself go too (a fresh, non-resumed run).
+    """
     conn = get_conn()
     cur = conn.cursor()
 
-    cur.execute(
+    for table in ("run_progress", "skipped_legs"):
+        cur.execute(f"DELETE FROM {table} WHERE run_date < ?", (str(run_date),))
+        if not keep_current:
+            cur.execute(f"DELETE FROM {table} WHERE run_date = ?", (str(run_date),))
+
+    conn.commit()
+    conn.close()
+
+
+def save_skipped_legs(run_date, legs, reason):
+    """legs: (origin, destination, leg_date, allow_klm_from_ams) tuples."""
+    conn = get_conn()
+    cur = conn.cursor()
+
+    cur.executemany(
         """
-        INSERT INTO learning_prices (
-            run_date,
-            sample_name,
-            outbound,
-            inbound,
-            days_to_departure,
-            pattern,
-            best_outbound,
-            best_inbound,
-            best_combo,
-            outbound_origin,
-            outbound_destination,
-            outbound_airline,
-            outbound_departure_time,
-            outbound_arrival_time,
-            outbound_source_url,
-            inbound_origin,
-            inbound_destination,
-            inbound_airline,
-            inbound_departure_time,
-            inbound_arrival_time,
-            inbound_source_url
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        INSERT OR REPLACE INTO skipped_legs VALUES (?, ?, ?, ?, ?, ?)
         """,
-        (
-            str(run_date),
-            sample_name,
-            str(outbound),
-            str(inbound),
-            days_to_departure,
-            pattern,
-            best_outbound,
-            best_inbound,
-            best_combo,
-            outbound_origin,
-            outbound_destination,
-            outbound_airline,
-            outbound_departure_time,
-            outbound_arrival_time,
-            outbound_source_url,
-            inbound_origin,
-            inbound_destination,
-            inbound_airline,
-            inbound_departure_time,
-            inbound_arrival_time,
-            inbound_source_url,
-        ),
+        [
+            (str(run_date), origin, destination, str(leg_date), int(allow_klm), reason)
+            for origin, destination, leg_date, allow_klm in legs
+        ],
     )
 
     conn.commit()
     conn.close()
 
 
+def get_leg_progress(run_date):
+    """Legs already completed for run_date: (origin, destination, leg_date, allow_klm) -> rows."""
+    conn = get_conn()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        SELECT origin, destination, leg_date, allow_klm_from_ams, rows_json
+        FROM run_progress
+        WHERE run_date = ?
+        """,
+        (str(run_date),),
+    )
+
+    rows = cur.fetchall()
+    conn.close()
+
+    progress = {}
+    for origin, destination, leg_date, allow_klm, rows_json in rows:
+        leg_rows = json.loads(rows_json)
+        for row in leg_rows:
+            row["leg_date"] = date.fromisoformat(row["leg_date"])
+        progress[(origin, destination, date.fromisoformat(leg_date), bool(allow_klm))] = leg_rows
+
+    return progress
+
+
 def get_weekend_history(outbound, inbound):
     conn = get_conn()
     cur = conn.cursor()
@@ -214,6 +862,198 @@ def get_weekend_history(outbound, inbound):
     ]
 
 
+def get_leg_observations(origin, destination, leg_date):
+    """Every flight option seen for one leg, decoded, by run_date then price."""
+    conn = get_conn()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        SELECT
+            o.run_day,
+            airline.value,
+            o.departure_min,
+            o.arrival_min,
+            o.price_cents,
+            provider.value,
+            o.flight_no,
+            o.source_url
+        FROM leg_observations o
+        JOIN dictionary origin ON origin.id = o.origin_id
+        JOIN dictionary destination ON destination.id = o.destination_id
+        JOIN dictionary airline ON airline.id = o.airline_id
+        LEFT JOIN dictionary provider ON provider.id = o.provider_id
+        WHERE origin.value = ? AND destination.value = ? AND o.leg_day = ?
+        ORDER BY o.run_day, o.price_cents
+        """,
+        (origin, destination, _day_number(leg_date)),
+    )
+
+    rows = cur.fetchall()
+    conn.close()
+
+    return [
+        {
+            "run_date": _from_day_number(r[0]),
+            "origin": origin,
+            "destination": destination,
+            "leg_date": leg_date if isinstance(leg_date, date) else date.fromisoformat(leg_date),
+            "airline": r[1],
+            "departure": _fmt_minutes(r[2]),
+            "arrival": _fmt_minutes(r[3]),
+            "price": r[4] / 100,
+            "provider": r[5],
+            "flight_no": r[6],
+            "source_url": r[7],
+        }
+        for r in rows
+    ]
+
+
+# Pairs per bulk query; keeps the bound parameters well below SQLite's limit.
+SUMMARY_CHUNK_PAIRS = 500
+
+
+def get_weekend_summaries(pairs, last_n: int = 6, before=None, priced_only: bool = False):
+    """
+    History summary for every (outbound, inbound) in `pairs`, two lookups
+    per SUMMARY_CHUNK_PAIRS pairs:
+
+    - history_rows: the last `last_n` rows, oldest first
+    - latest / previous: the last two rows (None when missing)
+    - min_outbound / min_inbound / min_combo / max_combo: over all rows,
+      read from weekend_stats
+
+    `before` only counts runs before that date; `priced_only` only keeps
+    rows with a best_combo in history_rows (the minima already skip missing
+    prices). Pairs without history get an empty summary.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    summaries = {
+        pair: {
+            "history_rows": [],
+            "latest": None,
+            "previous": None,
+            "min_outbound": None,
+            "min_inbound": None,
+            "min_combo": None,
+            "max_combo": None,
+        }
+        for pair in pairs
+    }
+    by_key = {(str(outbound), str(inbound)): (outbound, inbound) for outbound, inbound in pairs}
+
+    filters = []
+    filter_params = []
+    if before is not None:
+        filters.append("AND w.run_date < ?")
+        filter_params.append(str(before))
+    if priced_only:
+        filters.append("AND w.best_combo IS NOT NULL")
+
+    conn = get_conn()
+    cur = conn.cursor()
+
+    # Pairs already scanned on or after `before` (a rerun): their running
+    # minima include those runs, so they are recomputed from the rows.
+    recompute = []
+
+    keys = list(by_key)
+    for start in range(0, len(keys), SUMMARY_CHUNK_PAIRS):
+        chunk = keys[start:start + SUMMARY_CHUNK_PAIRS]
+        wanted = f"WITH wanted(outbound, inbound) AS (VALUES {', '.join('(?, ?)' for _ in chunk)})"
+        chunk_params = [value for key in chunk for value in key]
+
+        cur.execute(
+            f"""
+            {wanted}
+            SELECT
+                s.outbound, s.inbound, s.min_outbound, s.min_inbound,
+                s.min_combo, s.max_combo, s.last_run_date
+            FROM wanted
+            JOIN weekend_stats s
+              ON s.outbound = wanted.outbound AND s.inbound = wanted.inbound
+            """,
+            chunk_params,
+        )
+
+        for r in cur.fetchall():
+            if before is not None and r[6] >= str(before):
+                recompute.append((r[0], r[1]))
+                continue
+
+            summary = summaries[by_key[(r[0], r[1])]]
+            summary["min_outbound"] = r[2]
+            summary["min_inbound"] = r[3]
+            summary["min_combo"] = r[4]
+            summary["max_combo"] = r[5]
+
+        # The last `last_n` rows of each pair, straight off the pair index.
+        cur.execute(
+            f"""
+            {wanted}
+            SELECT
+                w.outbound, w.inbound, w.run_date, w.best_outbound, w.best_inbound, w.best_combo
+            FROM wanted
+            JOIN weekend_prices w
+              ON w.rowid IN (
+                SELECT w.rowid
+                FROM weekend_prices w
+                WHERE w.outbound = wanted.outbound AND w.inbound = wanted.inbound
+                {" ".join(filters)}
+                ORDER BY w.run_date DESC, w.rowid DESC
+                LIMIT ?
+              )
+            ORDER BY w.outbound, w.inbound, w.run_date, w.rowid
+            """,
+            chunk_params + filter_params + [last_n],
+        )
+
+        for r in cur.fetchall():
+            summaries[by_key[(r[0], r[1])]]["history_rows"].append(
+                {
+                    "run_date": r[2],
+                    "best_outbound": r[3],
+                    "best_inbound": r[4],
+                    "best_combo": r[5],
+                }
+            )
+
+    for start in range(0, len(recompute), SUMMARY_CHUNK_PAIRS):
+        chunk = recompute[start:start + SUMMARY_CHUNK_PAIRS]
+
+        cur.execute(
+            f"""
+            WITH wanted(outbound, inbound) AS (VALUES {", ".join("(?, ?)" for _ in chunk)})
+            SELECT
+                w.outbound, w.inbound,
+                MIN(w.best_outbound), MIN(w.best_inbound), MIN(w.best_combo), MAX(w.best_combo)
+            FROM wanted
+            JOIN weekend_prices w
+              ON w.outbound = wanted.outbound AND w.inbound = wanted.inbound
+            WHERE w.run_date < ?
+            GROUP BY w.outbound, w.inbound
+            """,
+            [value for key in chunk for value in key] + [str(before)],
+        )
+
+        for r in cur.fetchall():
+            summary = summaries[by_key[(r[0], r[1])]]
+            summary["min_outbound"] = r[2]
+            summary["min_inbound"] = r[3]
+            summary["min_combo"] = r[4]
+            summary["max_combo"] = r[5]
+
+    conn.close()
+
+    for summary in summaries.values():
+        history = summary["history_rows"]
+        summary["latest"] = history[-1] if history else None
+        summary["previous"] = history[-2] if len(history) >= 2 else None
+
+    return summaries
+
+
 def get_latest_learning_opportunities(limit: int = 10):
     conn = get_conn()
     cur = conn.cursor()
@@ -283,16 +1123,16 @@ def get_latest_learning_opportunities(limit: int = 10):
 
 
 def get_learning_stats(days_to_departure: int, pattern: str):
+    """Priced samples within 10 days of `days_to_departure`, from learning_stats."""
     conn = get_conn()
     cur = conn.cursor()
 
     cur.execute(
         """
-        SELECT best_combo
-        FROM learning_prices
+        SELECT SUM(combo_count), SUM(combo_sum), MIN(min_combo)
+        FROM learning_stats
         WHERE pattern = ?
           AND days_to_departure BETWEEN ? AND ?
-          AND best_combo IS NOT NULL
         """,
         (
             pattern,
@@ -301,10 +1141,10 @@ def get_learning_stats(days_to_departure: int, pattern: str):
         ),
     )
 
-    rows = [r[0] for r in cur.fetchall()]
+    count, combo_sum, min_combo = cur.fetchone()
     conn.close()
 
-    if not rows:
+    if not count:
         return {
             "count": 0,
             "avg_combo": None,
@@ -312,7 +1152,7 @@ def get_learning_stats(days_to_departure: int, pattern: str):
         }
 
     return {
-        "count": len(rows),
-        "avg_combo": sum(rows) / len(rows),
-        "min_combo": min(rows),
+        "count": count,
+        "avg_combo": combo_sum / count,
+        "min_combo": min_combo,
     }
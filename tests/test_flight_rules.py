@@ -0,0 +1,11 @@
+from src.scrapers.flight_rules import parse_price
+
+
+def test_parse_price_tells_decimals_from_thousands():
+    assert parse_price("Vueling 16:05 – 18:10 Direct 89,99 €") == 89.99
+    assert parse_price("Transavia Direct €89.99") == 89.99
+    assert parse_price("Direct 1.234 €") == 1234.0
+
+
+def test_parse_price_without_euro_amount():
+    assert parse_price("Direct 16:05 – 18:10") is None
@@ -0,0 +1,129 @@
+import json
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from src.models import LegRequest
+from src.scrapers import kiwi_api
+from src.scrapers.kiwi_api import HTTPPool, search_kiwi_legs
+from src.scrapers.rate_limiter import RateLimiter
+
+
+THURSDAY = date(2026, 12, 3)
+SUNDAY = date(2026, 12, 6)
+
+AMS_OUT = LegRequest("AMS", "BCN", THURSDAY)
+RTM_OUT = LegRequest("RTM", "BCN", THURSDAY)
+AMS_IN = LegRequest("BCN", "AMS", SUNDAY)
+
+
+def _itinerary(fly_from, fly_to, departure, arrival, price, airline="VY", segments=1):
+    return {
+        "flyFrom": fly_from,
+        "flyTo": fly_to,
+        "local_departure": f"{departure}:00.000Z",
+        "local_arrival": f"{arrival}:00.000Z",
+        "price": price,
+        "airlines": [airline],
+        "route": [{"airline": airline, "flight_no": 8300}] * segments,
+        "deep_link": "https://www.kiwi.com/deep",
+    }
+
+
+ITINERARIES = {
+    "AMS,RTM": [
+        _itinerary("AMS", "BCN", "2026-12-03T18:05", "2026-12-03T20:20", 89),
+        _itinerary("RTM", "BCN", "2026-12-03T19:00", "2026-12-03T21:10", 120, airline="HV"),
+        # Thursday before 16:00.
+        _itinerary("AMS", "BCN", "2026-12-03T10:00", "2026-12-03T12:15", 45),
+        # Not a requested leg date.
+        _itinerary("AMS", "BCN", "2026-12-04T18:05", "2026-12-04T20:20", 60),
+        # One stop.
+        _itinerary("AMS", "BCN", "2026-12-03T17:00", "2026-12-03T22:00", 70, segments=2),
+    ],
+    "BCN": [
+        _itinerary("BCN", "AMS", "2026-12-06T20:00", "2026-12-06T22:15", 99),
+        # Airline outside the allowed ones.
+        _itinerary("BCN", "AMS", "2026-12-06T21:00", "2026-12-06T23:15", 50, airline="FR"),
+    ],
+}
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    # Tests should not wait on the real per-domain budget.
+    monkeypatch.setattr(kiwi_api, "RATE_LIMITER", RateLimiter(rpm=6000, burst=100, jitter_s=0))
+
+    state = {"status": 200, "requests": []}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+            state["requests"].append((parts.path, params))
+
+            body = json.dumps({"data": ITINERARIES.get(params.get("fly_from"), [])}).encode()
+            self.send_response(state["status"])
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    state["base_url"] = f"http://127.0.0.1:{server.server_address[1]}"
+    pool = HTTPPool(timeout=5)
+    state["search"] = lambda legs: search_kiwi_legs(legs, base_url=state["base_url"], api_key="test", pool=pool)
+
+    yield state
+
+    pool.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_one_request_per_direction(stub_server):
+    stub_server["search"]([AMS_OUT, RTM_OUT, AMS_IN])
+
+    requests = stub_server["requests"]
+    assert [path for path, _ in requests] == ["/v2/search", "/v2/search"]
+
+    by_origin = {params["fly_from"]: params for _, params in requests}
+    outbound, inbound = by_origin["AMS,RTM"], by_origin["BCN"]
+    assert (outbound["fly_from"], outbound["fly_to"], outbound["fly_days"]) == ("AMS,RTM", "BCN", "4")
+    assert (inbound["fly_from"], inbound["fly_to"], inbound["fly_days"]) == ("BCN", "AMS", "0")
+    assert outbound["date_from"] == outbound["date_to"] == "03/12/2026"
+
+
+def test_itineraries_map_to_legs_and_are_filtered(stub_server):
+    results = stub_server["search"]([AMS_OUT, RTM_OUT, AMS_IN])
+
+    assert [(r["airline"], r["outbound_departure"], r["price"]) for r in results[AMS_OUT]] == [
+        ("Vueling", "6:05 PM", 89.0),
+    ]
+    assert [(r["airline"], r["outbound_departure"], r["price"]) for r in results[RTM_OUT]] == [
+        ("Transavia", "7:00 PM", 120.0),
+    ]
+    assert [(r["airline"], r["outbound_departure"], r["price"]) for r in results[AMS_IN]] == [
+        ("Vueling", "8:00 PM", 99.0),
+    ]
+    assert results[AMS_IN][0]["leg_type"] == "inbound"
+    assert results[AMS_OUT][0]["outbound_flight_no"] == "VY8300"
+
+
+def test_error_response_leaves_legs_empty(stub_server):
+    stub_server["status"] = 500
+
+    results = stub_server["search"]([AMS_OUT, AMS_IN])
+
+    assert results == {AMS_OUT: [], AMS_IN: []}
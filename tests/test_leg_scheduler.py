@@ -0,0 +1,33 @@
+import threading
+import time
+from datetime import date
+
+from src.scrapers.leg_scheduler import LegScheduler
+
+
+LEGS = [("AMS", "BCN", date(2026, 12, 3)), ("RTM", "BCN", date(2026, 12, 3)), ("BCN", "AMS", date(2026, 12, 6))]
+
+
+def test_breaker_waits_for_in_flight_legs_before_probing():
+    scheduler = LegScheduler(LEGS, max_attempts=1, breaker_threshold=1, breaker_cooldown_s=0.0)
+
+    first, attempt = scheduler.next_leg()
+    straggler, straggler_attempt = scheduler.next_leg()
+    scheduler.report(first, attempt, ok=False)
+
+    # Another worker asks for a leg after the cooldown, while the straggler
+    # started before the breaker opened is still running.
+    probes = []
+    worker = threading.Thread(target=lambda: probes.append(scheduler.next_leg()))
+    worker.start()
+    time.sleep(0.2)
+
+    scheduler.report(straggler, straggler_attempt, ok=False)
+    assert not scheduler.aborted
+
+    worker.join(timeout=5)
+    assert probes == [(LEGS[2], 1)]
+
+    scheduler.report(LEGS[2], 1, ok=True)
+    assert scheduler.next_leg() is None
+    assert scheduler.failed == LEGS[:2]